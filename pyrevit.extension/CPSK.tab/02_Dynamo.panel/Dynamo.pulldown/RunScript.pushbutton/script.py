@@ -14,6 +14,7 @@ import time
 import codecs
 import random
 import re
+import uuid
 import webbrowser
 from datetime import datetime
 
@@ -22,10 +23,10 @@ clr.AddReference('System.Drawing')
 
 import System
 from System.Windows.Forms import (
-    Form, Label, TextBox, Button, ListBox, TreeView, TreeNode,
+    Form, Label, TextBox, Button, ListView, ListViewItem, View, TreeView, TreeNode,
     Panel, SplitContainer, Orientation, DockStyle,
-    FormStartPosition, FormBorderStyle, SelectionMode,
-    Padding, DialogResult, SendKeys, Clipboard, LinkLabel
+    FormStartPosition, FormBorderStyle, ColumnHeaderStyle,
+    Padding, DialogResult, SendKeys, Clipboard, LinkLabel, Timer
 )
 from System.Drawing import Point, Size, Color, Font, FontStyle
 
@@ -41,7 +42,7 @@ if LIB_DIR not in sys.path:
 # Импорт модулей из lib
 from cpsk_notify import show_error, show_info, show_success, show_warning, show_confirm
 from cpsk_auth import require_auth
-from cpsk_config import get_setting, set_setting
+from cpsk_config import get_setting, set_settings, flush_settings, SETTINGS_FILE
 
 # Проверка авторизации
 if not require_auth():
@@ -63,6 +64,55 @@ def find_urls(text):
     return results
 
 
+# === ЧТЕНИЕ JSON ===
+
+# Быстрый JSON парсер, если доступен (CPython), иначе стандартный json.
+# Под IronPython orjson/ujson (C-расширения) не импортируются - всегда json
+try:
+    import orjson as _fast_json
+    _json_loads = _fast_json.loads
+except ImportError:
+    try:
+        import ujson as _fast_json
+        _json_loads = _fast_json.loads
+    except ImportError:
+        _json_loads = json.loads
+
+# Метаданные Dynamo 2.x: Description и Name лежат в начале файла, а Author -
+# после массивов Nodes/Connectors, в последних килобайтах. Читаем начало и,
+# если ключей не хватает, хвост файла - без разбора всего документа
+DYN_HEAD_SIZE = 16384
+DYN_TAIL_SIZE = 8192  # Начальное окно чтения с конца, растёт до находки ключей
+# Ключи верхнего уровня .dyn (отступ 2 пробела, вложенные узлы глубже)
+DYN_META_PATTERN = re.compile(
+    r'^  "(Description|Author|Name)": "((?:[^"\\]|\\.)*)"', re.MULTILINE)
+DYN_META_KEYS = {'Description': 'description', 'Author': 'author', 'Name': 'name'}
+
+
+def _scan_dyn_meta(text, found):
+    """Дополнить found ключами метаданных верхнего уровня из фрагмента .dyn."""
+    for match in DYN_META_PATTERN.finditer(text):
+        found.setdefault(DYN_META_KEYS[match.group(1)], match.group(2))
+
+
+def _scan_dyn_tail(f, head_size, found):
+    """
+    Искать недостающие ключи метаданных с конца файла (f открыт в 'rb').
+    Окно удваивается, пока ключи не найдены или не дошли до заголовка.
+    """
+    f.seek(0, 2)
+    size = f.tell()
+    window = DYN_TAIL_SIZE
+    while len(found) < len(DYN_META_KEYS):
+        start = max(head_size, size - window)
+        f.seek(start)
+        # Обрезанный на границе окна символ UTF-8 отбрасываем - ключи ASCII
+        _scan_dyn_meta(f.read(size - start).decode('utf-8', 'ignore'), found)
+        if start == head_size:
+            break
+        window *= 2
+
+
 # === НАСТРОЙКИ ===
 
 # Путь к папке со скриптами - в папке 02_Dynamo.panel
@@ -71,7 +121,17 @@ SCRIPTS_FOLDER = os.path.join(PANEL_FOLDER, "dynamo_scripts")
 
 # Конфиг хранится в cpsk_settings.yaml через cpsk_config
 MAX_RECENT = 20
-PAGE_SIZE = 100
+SEARCH_DELAY_MS = 250  # Пауза после ввода перед поиском
+INFO_CACHE_SIZE = 512  # Макс. записей в кэше метаданных скриптов
+# Журнал запусков (по строке JSON на запуск), переносится в настройки при открытии
+STATS_LOG = SETTINGS_FILE + ".dynamo_runs.log"
+# Личный журнал формы: запуски, уже учтённые в памяти, но ещё не сохранённые
+PENDING_LOG_FMT = STATS_LOG + ".{}.pending"
+
+# Теги специальных узлов дерева (сравниваются через "is")
+ALL_TAG = object()
+RECENT_TAG = object()
+FAV_TAG = object()
 
 # Отладка
 output = script.get_output()
@@ -179,6 +239,20 @@ class ScriptScanner:
         self.scripts_folder = scripts_folder
         self._cache = {}
         self._all_scripts = []
+        self._tree_cache = None  # (mtime всех папок дерева, дерево)
+
+    def _make_script(self, full_path, category, rel_path=None):
+        """Создать запись о скрипте (строка для списка вычисляется один раз)."""
+        if rel_path is None:
+            rel_path = os.path.relpath(full_path, self.scripts_folder)
+        name = os.path.splitext(os.path.basename(full_path))[0]
+        return {
+            'name': name,
+            'path': full_path,
+            'rel_path': rel_path,
+            'category': category,
+            'display': "{} ({})".format(name, category)
+        }
 
     def scan_categories(self):
         """Получить все папки-категории (только первый уровень)."""
@@ -215,6 +289,38 @@ class ScriptScanner:
             pass
         return result
 
+    def get_folder_tree(self):
+        """
+        Дерево папок скриптов.
+        Кэшируется, пока не изменилось время изменения ни одной папки дерева
+        (добавление/удаление/переименование подпапки меняет mtime родителя).
+        """
+        if self._tree_cache is not None:
+            mtimes, tree = self._tree_cache
+            if self._folder_mtimes(mtimes.keys()) == mtimes:
+                return tree
+
+        tree = self.scan_folder_tree(self.scripts_folder)
+        paths = [self.scripts_folder]
+        stack = list(tree)
+        while stack:
+            folder = stack.pop()
+            paths.append(folder['path'])
+            stack.extend(folder['children'])
+        self._tree_cache = (self._folder_mtimes(paths), tree)
+        return tree
+
+    def _folder_mtimes(self, paths):
+        """Время изменения папок {путь: mtime} (None для недоступных)."""
+        mtimes = {}
+        for path in paths:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                mtime = None
+            mtimes[path] = mtime
+        return mtimes
+
     def get_scripts_in_category(self, category):
         """Получить .dyn скрипты только в указанной папке (без подпапок)."""
         if category in self._cache:
@@ -232,13 +338,7 @@ class ScriptScanner:
                     if f.lower().endswith('.dyn'):
                         full_path = os.path.join(category_path, f)
                         if os.path.isfile(full_path):
-                            rel_path = os.path.relpath(full_path, self.scripts_folder)
-                            scripts.append({
-                                'name': os.path.splitext(f)[0],
-                                'path': full_path,
-                                'rel_path': rel_path,
-                                'category': category
-                            })
+                            scripts.append(self._make_script(full_path, category))
             except:
                 pass
 
@@ -264,12 +364,7 @@ class ScriptScanner:
                         full_path = os.path.join(root, f)
                         rel_path = os.path.relpath(full_path, self.scripts_folder)
                         category = os.path.dirname(rel_path) or "root"
-                        all_scripts.append({
-                            'name': os.path.splitext(f)[0],
-                            'path': full_path,
-                            'rel_path': rel_path,
-                            'category': category
-                        })
+                        all_scripts.append(self._make_script(full_path, category, rel_path))
         except:
             pass
 
@@ -302,8 +397,22 @@ class ScriptScanner:
         info = {'description': '', 'author': '', 'name': ''}
 
         try:
-            with codecs.open(script_path, 'r', 'utf-8') as f:
-                data = json.load(f)
+            with open(script_path, 'rb') as f:
+                head = f.read(DYN_HEAD_SIZE)
+
+                # Быстрый путь: ключи из заголовка и, при нехватке, из хвоста файла
+                found = {}
+                _scan_dyn_meta(head.decode('utf-8', 'ignore'), found)
+                if len(found) < len(DYN_META_KEYS) and len(head) == DYN_HEAD_SIZE:
+                    _scan_dyn_tail(f, len(head), found)
+                if len(found) == len(DYN_META_KEYS):
+                    for key, raw in found.items():
+                        info[key] = _json_loads(u'"' + raw + u'"')
+                    return info
+
+                # Полный разбор документа (нестандартное форматирование)
+                f.seek(0)
+                data = _json_loads(f.read().decode('utf-8-sig'))
                 info['description'] = data.get('Description', '')
                 info['author'] = data.get('Author', '')
                 info['name'] = data.get('Name', '')
@@ -964,11 +1073,21 @@ class DynamoLauncherForm(Form):
     def __init__(self):
         self.scanner = ScriptScanner(SCRIPTS_FOLDER)
         self.current_scripts = []
-        self.current_page = 0
         self.selected_script = None
         self.recent = []
         self.favorites = []
         self.folders_synced = False
+        self._config_dirty = False
+        self._by_rel = {}  # rel_path -> скрипт
+        self._by_rel_source = None  # Список сканера, по которому построен _by_rel
+        self._info_cache = {}
+        self._last_tag = None
+        self._last_query = None
+        self._lazy_children = {}  # rel_path -> ещё не созданные дочерние папки
+        self._sync_cache = None  # (mtime настроек Dynamo, дерево папок, результат)
+        self._loaded_tree = None  # Дерево папок, по которому построен TreeView
+        # STATS_LOG общий для сессий Revit - форма переносит его в свой файл
+        self._pending_log = PENDING_LOG_FMT.format(uuid.uuid4().hex)
 
         self.load_config()
         self.setup_form()
@@ -984,34 +1103,177 @@ class DynamoLauncherForm(Form):
         if not isinstance(self.favorites, list):
             self.favorites = []
 
+        # Убираем дубли (с сохранением порядка) и держим множества для проверок "in"
+        self.recent = self._unique(self.recent)
+        self.favorites = self._unique(self.favorites)
+        self._recent_set = set(self.recent)
+        self._fav_set = set(self.favorites)
+
         # Статистика запусков: {rel_path: count}
         self.run_counts = get_setting("dynamo.run_counts", {})
         if not isinstance(self.run_counts, dict):
             self.run_counts = {}
 
+        # В YAML счётчики хранятся строками - в памяти держим числа
+        counts = {}
+        for rel_path, count in self.run_counts.items():
+            try:
+                count = int(count)
+            except (TypeError, ValueError):
+                count = 0
+            counts[rel_path] = count
+        self.run_counts = counts
+
         # Даты последнего запуска: {rel_path: timestamp}
         self.last_runs = get_setting("dynamo.last_runs", {})
         if not isinstance(self.last_runs, dict):
             self.last_runs = {}
 
+        self._fold_stats_log()
+
+    def _fold_stats_log(self):
+        """
+        Перенести запуски из журнала STATS_LOG в конфигурацию.
+        Журнал сначала переименовывается в личный файл формы: другая сессия
+        Revit может дописывать STATS_LOG, и учитываются только прочитанные строки.
+        Личный файл удаляется после успешного сохранения (save_config).
+        """
+        if not os.path.exists(STATS_LOG):
+            return
+
+        try:
+            os.rename(STATS_LOG, self._pending_log)
+        except OSError as e:
+            show_warning("Статистика запусков", "Не удалось забрать журнал запусков",
+                         details=str(e))
+            return
+
+        runs = []
+        skipped = 0
+        try:
+            with codecs.open(self._pending_log, 'r', 'utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    # Оборванная или повреждённая строка не должна блокировать журнал
+                    try:
+                        run = json.loads(line)
+                        run = (run['p'], run['t'])
+                    except (ValueError, KeyError, TypeError):
+                        skipped += 1
+                        continue
+                    runs.append(run)
+        except (IOError, OSError) as e:
+            show_warning("Статистика запусков", "Ошибка чтения журнала запусков",
+                         details=str(e))
+            return
+
+        if skipped:
+            show_warning("Статистика запусков",
+                         "Пропущено повреждённых строк журнала: {}".format(skipped))
+
+        for rel_path, timestamp in runs:
+            self._apply_run(rel_path, timestamp)
+
+        self.save_config()
+
+    def _apply_run(self, rel_path, timestamp):
+        """Учесть запуск скрипта: недавние, счётчик, дата последнего запуска."""
+        if rel_path in self._recent_set:
+            self.recent.remove(rel_path)
+        self.recent.insert(0, rel_path)
+        self.recent = self.recent[:MAX_RECENT]
+        self._recent_set = set(self.recent)
+        # Порядок "Недавних" изменился - следующий выбор перестроит список
+        self._last_tag = None
+
+        self.run_counts[rel_path] = self.run_counts.get(rel_path, 0) + 1
+
+        self.last_runs[rel_path] = timestamp
+
+    def _log_run(self, rel_path, timestamp):
+        """
+        Дописать запуск в личный журнал формы. Возвращает False при ошибке записи.
+        При закрытии формы несохранённые запуски переносятся в STATS_LOG.
+        """
+        try:
+            with codecs.open(self._pending_log, 'a', 'utf-8') as f:
+                f.write(json.dumps({'p': rel_path, 't': timestamp}) + '\n')
+            return True
+        except (IOError, OSError):
+            return False
+
+    @staticmethod
+    def _unique(items):
+        """Убрать повторы из списка, сохранив порядок."""
+        seen = set()
+        result = []
+        for item in items:
+            if item not in seen:
+                seen.add(item)
+                result.append(item)
+        return result
+
     def save_config(self):
-        """Сохранить конфигурацию в cpsk_settings.yaml."""
-        set_setting("dynamo.recent", self.recent[:MAX_RECENT])
-        set_setting("dynamo.favorites", self.favorites)
-        set_setting("dynamo.run_counts", self.run_counts)
-        set_setting("dynamo.last_runs", self.last_runs)
+        """
+        Сохранить конфигурацию в JSON-кэш настроек.
+        YAML перезаписывается один раз при закрытии формы (flush_config).
+        """
+        saved = set_settings({
+            "dynamo.recent": self.recent[:MAX_RECENT],
+            "dynamo.favorites": self.favorites,
+            "dynamo.run_counts": self.run_counts,
+            "dynamo.last_runs": self.last_runs,
+        }, write_yaml=False)
+        self._config_dirty = True
+
+        # Запуски из личного журнала вошли в сохранённую статистику -
+        # иначе при следующем открытии они учлись бы повторно
+        if saved and os.path.exists(self._pending_log):
+            try:
+                os.remove(self._pending_log)
+            except OSError as e:
+                show_warning("Статистика запусков", "Не удалось удалить журнал запусков",
+                             details=str(e))
+
+    def _release_pending_log(self):
+        """Вернуть несохранённые запуски в общий журнал STATS_LOG."""
+        if not os.path.exists(self._pending_log):
+            return
+
+        try:
+            with codecs.open(self._pending_log, 'r', 'utf-8') as f:
+                pending = f.read()
+            with codecs.open(STATS_LOG, 'a', 'utf-8') as f:
+                f.write(pending)
+            os.remove(self._pending_log)
+        except (IOError, OSError) as e:
+            show_warning("Статистика запусков", "Не удалось сохранить журнал запусков",
+                         details=str(e))
+
+    def flush_config(self):
+        """Записать изменения конфигурации в cpsk_settings.yaml."""
+        if self._config_dirty:
+            flush_settings()
+            self._config_dirty = False
 
     def setup_form(self):
         """Настройка формы."""
+        # Раскладка контролов выполняется один раз в конце (PerformLayout)
+        self.SuspendLayout()
+
         self.Text = "Запуск Dynamo скриптов - CPSK"
         self.Width = 900
         self.Height = 550
         self.StartPosition = FormStartPosition.CenterScreen
         self.FormBorderStyle = FormBorderStyle.Sizable
         self.MinimumSize = Size(700, 400)
+        self.FormClosed += self.on_form_closed
 
         # === ВЕРХНЯЯ ПАНЕЛЬ (Поиск) ===
         top_panel = Panel()
+        top_panel.SuspendLayout()
         top_panel.Dock = DockStyle.Top
         top_panel.Height = 40
 
@@ -1027,6 +1289,11 @@ class DynamoLauncherForm(Form):
         self.txt_search.TextChanged += self.on_search_changed
         top_panel.Controls.Add(self.txt_search)
 
+        # Таймер поиска: запускаем поиск только после паузы в наборе
+        self._search_timer = Timer()
+        self._search_timer.Interval = SEARCH_DELAY_MS
+        self._search_timer.Tick += self._do_search
+
         self.lbl_count = Label()
         self.lbl_count.Location = Point(320, 12)
         self.lbl_count.AutoSize = True
@@ -1049,6 +1316,7 @@ class DynamoLauncherForm(Form):
 
         # === НИЖНЯЯ ПАНЕЛЬ (Кнопки) ===
         bottom_panel = Panel()
+        bottom_panel.SuspendLayout()
         bottom_panel.Dock = DockStyle.Bottom
         bottom_panel.Height = 45
 
@@ -1091,6 +1359,9 @@ class DynamoLauncherForm(Form):
 
         # === ОСНОВНАЯ ПАНЕЛЬ ===
         main_split = SplitContainer()
+        main_split.SuspendLayout()
+        main_split.Panel1.SuspendLayout()
+        main_split.Panel2.SuspendLayout()
         main_split.Dock = DockStyle.Fill
         main_split.Orientation = Orientation.Vertical
         main_split.SplitterDistance = 80
@@ -1105,6 +1376,7 @@ class DynamoLauncherForm(Form):
         self.tree_categories = TreeView()
         self.tree_categories.Dock = DockStyle.Fill
         self.tree_categories.AfterSelect += self.on_category_selected
+        self.tree_categories.BeforeExpand += self.on_tree_before_expand
 
         # ВАЖНО: порядок добавления для Dock - сначала Fill, потом Top
         # НО контролы добавляются в обратном порядке визуально
@@ -1119,42 +1391,26 @@ class DynamoLauncherForm(Form):
         lbl_scripts.Height = 25
         lbl_scripts.Font = Font(lbl_scripts.Font, FontStyle.Bold)
 
-        # Пагинация
-        page_panel = Panel()
-        page_panel.Dock = DockStyle.Bottom
-        page_panel.Height = 25
-
-        self.btn_prev = Button()
-        self.btn_prev.Text = "< Назад"
-        self.btn_prev.Location = Point(5, 3)
-        self.btn_prev.Width = 70
-        self.btn_prev.Click += self.on_prev_page
-        self.btn_prev.Enabled = False
-        page_panel.Controls.Add(self.btn_prev)
-
-        self.lbl_page = Label()
-        self.lbl_page.Location = Point(85, 7)
-        self.lbl_page.AutoSize = True
-        self.lbl_page.Text = ""
-        page_panel.Controls.Add(self.lbl_page)
-
-        self.btn_next = Button()
-        self.btn_next.Text = "Далее >"
-        self.btn_next.Location = Point(180, 3)
-        self.btn_next.Width = 70
-        self.btn_next.Click += self.on_next_page
-        self.btn_next.Enabled = False
-        page_panel.Controls.Add(self.btn_next)
-
-        # Список скриптов
-        self.list_scripts = ListBox()
+        # Список скриптов (виртуальный: строки создаются только для видимой части)
+        self.list_scripts = ListView()
         self.list_scripts.Dock = DockStyle.Fill
-        self.list_scripts.SelectionMode = SelectionMode.One
+        self.list_scripts.View = View.Details
+        # ColumnHeaderStyle.None - "None" зарезервировано в Python
+        self.list_scripts.HeaderStyle = getattr(ColumnHeaderStyle, 'None')
+        self.list_scripts.FullRowSelect = True
+        self.list_scripts.MultiSelect = False
+        self.list_scripts.HideSelection = False
+        self.list_scripts.Columns.Add("Скрипт")
+        self.list_scripts.VirtualMode = True
+        self.list_scripts.VirtualListSize = 0
+        self.list_scripts.RetrieveVirtualItem += self.on_retrieve_script_item
+        self.list_scripts.Resize += self.on_list_resize
         self.list_scripts.SelectedIndexChanged += self.on_script_selected
         self.list_scripts.DoubleClick += self.on_run_click
 
         # Панель описания скрипта
         desc_panel = Panel()
+        desc_panel.SuspendLayout()
         desc_panel.Dock = DockStyle.Bottom
         desc_panel.Height = 85
         desc_panel.Padding = Padding(3)
@@ -1187,7 +1443,6 @@ class DynamoLauncherForm(Form):
         # Fill должен быть добавлен ПЕРВЫМ, Top/Bottom - ПОСЛЕ
         main_split.Panel2.Controls.Add(self.list_scripts)  # Fill - первый
         main_split.Panel2.Controls.Add(desc_panel)          # Bottom (описание)
-        main_split.Panel2.Controls.Add(page_panel)          # Bottom (пагинация)
         main_split.Panel2.Controls.Add(lbl_scripts)         # Top - последний
 
         # ВАЖНО: Порядок добавления в главную форму
@@ -1196,42 +1451,77 @@ class DynamoLauncherForm(Form):
         self.Controls.Add(bottom_panel) # Bottom
         self.Controls.Add(top_panel)    # Top
 
+        desc_panel.ResumeLayout(False)
+        main_split.Panel1.ResumeLayout(False)
+        main_split.Panel2.ResumeLayout(False)
+        main_split.ResumeLayout(False)
+        bottom_panel.ResumeLayout(False)
+        top_panel.ResumeLayout(False)
+        self.ResumeLayout(False)
+        self.PerformLayout()
+
     def load_categories(self):
         """Загрузить дерево категорий."""
-        self.tree_categories.Nodes.Clear()
-
-        # Специальные узлы
-        all_node = TreeNode("Все скрипты")
-        all_node.Tag = "__all__"
-        self.tree_categories.Nodes.Add(all_node)
+        # Одна перерисовка дерева после добавления всех узлов
+        self.tree_categories.BeginUpdate()
+        try:
+            self.tree_categories.Nodes.Clear()
+            self._lazy_children = {}
 
-        recent_node = TreeNode("Недавние")
-        recent_node.Tag = "__recent__"
-        self.tree_categories.Nodes.Add(recent_node)
+            # Специальные узлы
+            all_node = TreeNode("Все скрипты")
+            all_node.Tag = ALL_TAG
+            self.tree_categories.Nodes.Add(all_node)
 
-        fav_node = TreeNode("Избранное")
-        fav_node.Tag = "__favorites__"
-        self.tree_categories.Nodes.Add(fav_node)
+            recent_node = TreeNode("Недавние")
+            recent_node.Tag = RECENT_TAG
+            self.tree_categories.Nodes.Add(recent_node)
 
-        # Папки-категории с вложенной структурой
-        folder_tree = self.scanner.scan_folder_tree(SCRIPTS_FOLDER)
-        self._add_folder_nodes(self.tree_categories.Nodes, folder_tree)
+            fav_node = TreeNode("Избранное")
+            fav_node.Tag = FAV_TAG
+            self.tree_categories.Nodes.Add(fav_node)
 
-        # Развернуть все узлы
-        self.tree_categories.ExpandAll()
+            # Папки-категории с вложенной структурой
+            folder_tree = self.scanner.get_folder_tree()
+            self._add_folder_nodes(self.tree_categories.Nodes, folder_tree)
+            self._loaded_tree = folder_tree
+        finally:
+            self.tree_categories.EndUpdate()
 
         # Выбрать "Все скрипты"
         if self.tree_categories.Nodes.Count > 0:
             self.tree_categories.SelectedNode = self.tree_categories.Nodes[0]
 
     def _add_folder_nodes(self, parent_nodes, folders):
-        """Рекурсивно добавить узлы папок в дерево."""
+        """
+        Добавить узлы папок одного уровня.
+        Вложенные папки создаются при первом раскрытии узла (on_tree_before_expand),
+        до этого у узла есть только заглушка, чтобы показывался "+".
+        """
         for folder in folders:
             node = TreeNode(folder['name'])
             node.Tag = folder['rel_path']
             parent_nodes.Add(node)
             if folder['children']:
-                self._add_folder_nodes(node.Nodes, folder['children'])
+                self._lazy_children[folder['rel_path']] = folder['children']
+                node.Nodes.Add(TreeNode("..."))
+
+    def on_tree_before_expand(self, sender, args):
+        """Создать дочерние узлы папки при первом раскрытии."""
+        node = args.Node
+        if node.Tag is None:
+            return
+
+        children = self._lazy_children.pop(str(node.Tag), None)
+        if children is None:
+            return
+
+        self.tree_categories.BeginUpdate()
+        try:
+            node.Nodes.Clear()
+            self._add_folder_nodes(node.Nodes, children)
+        finally:
+            self.tree_categories.EndUpdate()
 
     def on_category_selected(self, sender, args):
         """Выбрана категория."""
@@ -1243,36 +1533,67 @@ class DynamoLauncherForm(Form):
         if tag is None:
             return
 
-        self.current_page = 0
-        tag_str = str(tag)
-
-        if tag_str == "__all__":
-            self.current_scripts = self.scanner.get_all_scripts()
-        elif tag_str == "__recent__":
-            all_scripts = self.scanner.get_all_scripts()
-            recent_set = set(self.recent)
-            self.current_scripts = [s for s in all_scripts if s['rel_path'] in recent_set]
-        elif tag_str == "__favorites__":
-            all_scripts = self.scanner.get_all_scripts()
-            fav_set = set(self.favorites)
-            self.current_scripts = [s for s in all_scripts if s['rel_path'] in fav_set]
+        query = self.txt_search.Text
+
+        # Та же категория и тот же запрос - список уже актуален
+        if (tag, query) == (self._last_tag, self._last_query):
+            return
+        self._last_tag = tag
+        self._last_query = query
+
+        if tag is ALL_TAG:
+            self.current_scripts = self._all_scripts()
+        elif tag is RECENT_TAG:
+            # Порядок списка недавних сохраняется (последние - сверху)
+            self._all_scripts()
+            self.current_scripts = [self._by_rel[p] for p in self.recent if p in self._by_rel]
+        elif tag is FAV_TAG:
+            self._all_scripts()
+            self.current_scripts = [self._by_rel[p] for p in self.favorites if p in self._by_rel]
         else:
-            self.current_scripts = self.scanner.get_scripts_in_category(tag_str)
+            self.current_scripts = self.scanner.get_scripts_in_category(str(tag))
 
         # Применить поиск
-        query = self.txt_search.Text
         if query:
             self.current_scripts = self.scanner.search_scripts(query, self.current_scripts)
 
         self.update_scripts_list()
 
+    def _all_scripts(self):
+        """Все скрипты из кэша сканера; индекс _by_rel перестраивается при его смене."""
+        scripts = self.scanner.get_all_scripts()
+        if scripts is not self._by_rel_source:
+            self._by_rel = dict((s['rel_path'], s) for s in scripts)
+            self._by_rel_source = scripts
+        return scripts
+
+    def _info(self, path):
+        """Метаданные скрипта (кэш по пути и времени изменения файла)."""
+        try:
+            key = (path, os.stat(path).st_mtime)
+        except OSError:
+            return self.scanner.get_script_info(path)
+
+        info = self._info_cache.get(key)
+        if info is None:
+            info = self.scanner.get_script_info(path)
+            if len(self._info_cache) >= INFO_CACHE_SIZE:
+                self._info_cache.clear()
+            self._info_cache[key] = info
+        return info
+
     def on_search_changed(self, sender, args):
-        """Изменён поиск."""
+        """Изменён поиск - перезапускаем таймер."""
+        self._search_timer.Stop()
+        self._search_timer.Start()
+
+    def _do_search(self, sender, args):
+        """Выполнить поиск после паузы в наборе."""
+        self._search_timer.Stop()
         self.on_category_selected(None, None)
 
     def update_scripts_list(self):
         """Обновить список скриптов."""
-        self.list_scripts.Items.Clear()
         self.selected_script = None
         self.btn_run.Enabled = False
         self.btn_favorite.Enabled = False
@@ -1286,43 +1607,31 @@ class DynamoLauncherForm(Form):
             self.lbl_info.Text = "Выберите скрипт для запуска"
             self.lbl_info.ForeColor = Color.Gray
 
-        total = len(self.current_scripts)
-        start = self.current_page * PAGE_SIZE
-        end = min(start + PAGE_SIZE, total)
-
-        page_scripts = self.current_scripts[start:end]
-
-        for s in page_scripts:
-            display = "{} ({})".format(s['name'], s['category'])
-            self.list_scripts.Items.Add(display)
-
         # Счётчик
-        self.lbl_count.Text = "Найдено: {}".format(total)
-
-        # Пагинация
-        total_pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
-        current = self.current_page + 1
-
-        self.lbl_page.Text = "Стр. {} из {}".format(current, total_pages)
-        self.btn_prev.Enabled = self.current_page > 0
-        self.btn_next.Enabled = end < total
-
-    def on_prev_page(self, sender, args):
-        """Предыдущая страница."""
-        if self.current_page > 0:
-            self.current_page -= 1
-            self.update_scripts_list()
-
-    def on_next_page(self, sender, args):
-        """Следующая страница."""
-        total = len(self.current_scripts)
-        if (self.current_page + 1) * PAGE_SIZE < total:
-            self.current_page += 1
-            self.update_scripts_list()
+        self.lbl_count.Text = "Найдено: {}".format(len(self.current_scripts))
+
+        # Виртуальный список: меняем только размер, строки запрашиваются при отрисовке
+        self.list_scripts.SelectedIndices.Clear()
+        self.list_scripts.VirtualListSize = len(self.current_scripts)
+        self.list_scripts.Invalidate()
+
+    def on_retrieve_script_item(self, sender, args):
+        """Отдать строку виртуального списка по индексу."""
+        # ListViewItem создаётся один раз на скрипт и переиспользуется при прокрутке
+        script = self.current_scripts[args.ItemIndex]
+        item = script.get('item')
+        if item is None:
+            item = script['item'] = ListViewItem(script['display'])
+        args.Item = item
+
+    def on_list_resize(self, sender, args):
+        """Растянуть единственную колонку на ширину списка."""
+        self.list_scripts.Columns[0].Width = self.list_scripts.ClientSize.Width
 
     def on_script_selected(self, sender, args):
         """Выбран скрипт."""
-        idx = self.list_scripts.SelectedIndex
+        indices = self.list_scripts.SelectedIndices
+        idx = indices[0] if indices.Count > 0 else -1
         if idx < 0:
             self.selected_script = None
             self.btn_run.Enabled = False
@@ -1338,18 +1647,17 @@ class DynamoLauncherForm(Form):
                 self.lbl_info.ForeColor = Color.Gray
             return
 
-        actual_idx = self.current_page * PAGE_SIZE + idx
-        if actual_idx < len(self.current_scripts):
-            self.selected_script = self.current_scripts[actual_idx]
+        if idx < len(self.current_scripts):
+            self.selected_script = self.current_scripts[idx]
             rel_path = self.selected_script['rel_path']
 
             # Информация из .dyn файла
-            info = self.scanner.get_script_info(self.selected_script['path'])
+            info = self._info(self.selected_script['path'])
             desc = info.get('description', '')
             author = info.get('author', '')
 
             # Статистика запусков
-            run_count = int(self.run_counts.get(rel_path, 0))
+            run_count = self.run_counts.get(rel_path, 0)
             last_run = self.last_runs.get(rel_path, '')
 
             # Формируем строку статистики
@@ -1367,8 +1675,10 @@ class DynamoLauncherForm(Form):
                 self.lbl_description.ForeColor = Color.Black
                 # Настраиваем ссылки
                 self.lbl_description.Links.Clear()
-                urls = find_urls(desc)
-                for start, length, url in urls:
+                # Позиции ссылок вычисляются один раз и хранятся в кэше метаданных
+                if '_urls' not in info:
+                    info['_urls'] = find_urls(desc)
+                for start, length, url in info['_urls']:
                     link = self.lbl_description.Links.Add(start, length, url)
             else:
                 self.lbl_description.Text = "Нет описания"
@@ -1389,14 +1699,36 @@ class DynamoLauncherForm(Form):
                 self.lbl_info.ForeColor = Color.Orange
 
             # Текст кнопки избранного
-            if rel_path in self.favorites:
+            if rel_path in self._fav_set:
                 self.btn_favorite.Text = "Из избранного"
             else:
                 self.btn_favorite.Text = "В избранное"
 
+    def _folders_to_sync(self):
+        """
+        Папки для синхронизации (кэш).
+        Пересчитываются, если изменился файл настроек Dynamo или дерево папок
+        скриптов (сканер возвращает тот же объект дерева, пока папки не менялись).
+        """
+        settings_path = get_dynamo_settings_path()
+        try:
+            settings_mtime = os.stat(settings_path).st_mtime if settings_path else None
+        except OSError:
+            settings_mtime = None
+        tree = self.scanner.get_folder_tree()
+
+        if self._sync_cache is not None:
+            cached_mtime, cached_tree, cached_result = self._sync_cache
+            if cached_mtime == settings_mtime and cached_tree is tree:
+                return cached_result
+
+        to_sync = get_folders_to_sync()
+        self._sync_cache = (settings_mtime, tree, to_sync)
+        return to_sync
+
     def update_sync_status(self):
         """Обновить статус синхронизации папок."""
-        to_sync = get_folders_to_sync()
+        to_sync = self._folders_to_sync()
         if to_sync:
             self.btn_sync.Text = "Синхр. ({})".format(len(to_sync))
             self.btn_sync.BackColor = Color.LightYellow
@@ -1408,7 +1740,7 @@ class DynamoLauncherForm(Form):
 
     def on_sync_click(self, sender, args):
         """Синхронизировать папки с Dynamo Player."""
-        to_sync = get_folders_to_sync()
+        to_sync = self._folders_to_sync()
 
         if not to_sync:
             show_info("Синхронизация", "Все папки уже синхронизированы с Dynamo Player")
@@ -1423,6 +1755,8 @@ class DynamoLauncherForm(Form):
             return
 
         added = sync_all_folders()
+        self._sync_cache = None
+        self._last_tag = None
         self.update_sync_status()
         self.update_scripts_list()  # Обновить UI после синхронизации
 
@@ -1442,20 +1776,11 @@ class DynamoLauncherForm(Form):
         rel_path = self.selected_script['rel_path']
         category = self.selected_script['category']
 
-        # Добавить в недавние
-        if rel_path in self.recent:
-            self.recent.remove(rel_path)
-        self.recent.insert(0, rel_path)
-        self.recent = self.recent[:MAX_RECENT]
-
-        # Увеличить счётчик запусков
-        current_count = int(self.run_counts.get(rel_path, 0))
-        self.run_counts[rel_path] = str(current_count + 1)
-
-        # Сохранить дату последнего запуска
-        self.last_runs[rel_path] = datetime.now().strftime("%d.%m.%Y %H:%M")
-
-        self.save_config()
+        # Недавние, счётчик и дата запуска - в памяти, на диск только строка журнала
+        timestamp = datetime.now().strftime("%d.%m.%Y %H:%M")
+        self._apply_run(rel_path, timestamp)
+        if not self._log_run(rel_path, timestamp):
+            self.save_config()
 
         # Запустить
         success, script_name, folder_name = run_dynamo_script(script_path, category)
@@ -1475,13 +1800,18 @@ class DynamoLauncherForm(Form):
 
         rel_path = self.selected_script['rel_path']
 
-        if rel_path in self.favorites:
+        if rel_path in self._fav_set:
             self.favorites.remove(rel_path)
+            self._fav_set.discard(rel_path)
             self.btn_favorite.Text = "В избранное"
         else:
             self.favorites.append(rel_path)
+            self._fav_set.add(rel_path)
             self.btn_favorite.Text = "Из избранного"
 
+        # Состав "Избранного" изменился - следующий выбор перестроит список
+        self._last_tag = None
+
         self.save_config()
 
     def on_open_folder_click(self, sender, args):
@@ -1497,9 +1827,23 @@ class DynamoLauncherForm(Form):
 
     def on_refresh_click(self, sender, args):
         """Обновить список."""
+        # Сканер возвращает то же дерево, пока ни одна папка не менялась
+        # (добавление/удаление .dyn тоже меняет mtime папки) - перестраивать нечего
+        if self.scanner.get_folder_tree() is self._loaded_tree:
+            self.update_sync_status()
+            self.update_scripts_list()
+            return
+
         self.scanner.clear_cache()
+        self._last_tag = None
         self.load_categories()
 
+    def on_form_closed(self, sender, args):
+        """Форма закрыта."""
+        self._search_timer.Stop()
+        self._release_pending_log()
+        self.flush_config()
+
     def on_link_clicked(self, sender, args):
         """Открыть ссылку в браузере."""
         try:
@@ -13,35 +13,12 @@ __author__ = "CPSK"
 import clr
 import os
 import sys
-import codecs
-import uuid
 
-clr.AddReference('System.Windows.Forms')
-clr.AddReference('System.Drawing')
-clr.AddReference('System.Xml')
-
-import System
-from System.Windows.Forms import (
-    Form, Label, TextBox, Button, Panel, CheckBox, ComboBox,
-    DockStyle, FormStartPosition, FormBorderStyle,
-    MessageBox, MessageBoxButtons, MessageBoxIcon,
-    DialogResult, OpenFileDialog, SaveFileDialog, FolderBrowserDialog,
-    GroupBox, RadioButton
-)
-from System.Drawing import Point, Size, Color, Font, FontStyle
-from System.Xml import XmlDocument, XmlNamespaceManager
+# Добавляем support_files в путь для импорта ifc_mappings
+# (lib расширения pyRevit добавляет в sys.path сам - cpsk_paths доступен сразу)
+from cpsk_paths import SUPPORT_DIR, ensure_on_syspath
 
-from pyrevit import revit, forms, script
-
-# Добавляем lib и support_files в путь для импорта
-SCRIPT_DIR = os.path.dirname(__file__)
-EXTENSION_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(SCRIPT_DIR))))
-LIB_DIR = os.path.join(EXTENSION_DIR, "lib")
-SUPPORT_DIR = os.path.join(EXTENSION_DIR, "support_files")
-if LIB_DIR not in sys.path:
-    sys.path.insert(0, LIB_DIR)
-if SUPPORT_DIR not in sys.path:
-    sys.path.insert(0, SUPPORT_DIR)
+ensure_on_syspath(SUPPORT_DIR)
 
 # Проверка авторизации
 from cpsk_auth import require_auth
@@ -53,6 +30,17 @@ from cpsk_config import require_environment
 if not require_environment():
     sys.exit()
 
+import System
+from System import Guid
+from System.IO import StreamWriter
+from System.Text import UTF8Encoding, UnicodeEncoding
+
+# Импорт IFC маппингов из support_files
+from ifc_mappings import IFC_TO_REVIT_TYPE, IFC_ENTITY_CANONICAL
+
+# Кэш разобранных IDS (пропуск парсинга при повторной генерации из того же файла)
+from cpsk_ids_cache import load_cached, save_cached
+
 # Логгер
 from cpsk_logger import Logger
 
@@ -61,15 +49,155 @@ SCRIPT_NAME = "IDStoFOP"
 Logger.init(SCRIPT_NAME)
 Logger.info(SCRIPT_NAME, "Скрипт запущен")
 
-# Импорт IFC маппингов из support_files
-from ifc_mappings import IFC_TO_REVIT_TYPE
+# Пространства имён IDS и XML Schema
+IDS_NS = "http://standards.buildingsmart.org/IDS"
+XS_NS = "http://www.w3.org/2001/XMLSchema"
+LXML_NS = {"ids": IDS_NS, "xs": XS_NS}
+
+# lxml (CPython) - потоковый iterparse, иначе XmlReader
+try:
+    from lxml import etree as _etree
+    _HAS_LXML = True
+except ImportError:
+    _HAS_LXML = False
+
+if _HAS_LXML:
+    # XPath компилируются один раз и переиспользуются для всех спецификаций
+    def _xpath(expr):
+        return _etree.XPath(expr, namespaces=LXML_NS, smart_strings=False)
+
+    _XP_ENTITY = _xpath("ids:applicability/ids:entity")
+    _XP_ENTITY_SIMPLE = _xpath("ids:name/ids:simpleValue")
+    _XP_ENTITY_ENUM = _xpath("ids:name/xs:restriction/xs:enumeration/@value")
+    _XP_PROPERTY = _xpath("ids:requirements/ids:property")
+    _XP_PSET = _xpath("ids:propertySet/ids:simpleValue")
+    _XP_NAME_SIMPLE = _xpath("ids:baseName/ids:simpleValue")
+    _XP_NAME_ENUM = _xpath("ids:baseName/xs:restriction/xs:enumeration/@value")
+    # Допустимые значения: xs:enumeration, а если их нет - ids:enumeration
+    _XP_VALUE_ENUM_XS = _xpath("ids:value/xs:restriction/xs:enumeration")
+    _XP_VALUE_ENUM_IDS = _xpath("ids:value/ids:restriction/ids:enumeration")
+
+# Тип параметра Revit -> тип в файле IFC Mapping
+# IFC Mapping использует: Text, Real, Integer, Boolean, Length, Area, Volume, Angle
+IFC_MAPPING_TYPES = {
+    "TEXT": "Text",
+    "YESNO": "Boolean",
+    "INTEGER": "Integer",
+    "NUMBER": "Real",
+    "LENGTH": "Length",
+    "AREA": "Area",
+    "VOLUME": "Volume",
+    "ANGLE": "Angle",
+}
+
+# Запись результатов: буфер StreamWriter (символы) и размер порции строк
+WRITE_BUFFER_SIZE = 1 << 18
+WRITE_CHUNK_LINES = 1024
+
+# Кодировки .NET: UTF-8 без BOM, UTF-16 LE с BOM (требование Revit для ФОП)
+WRITE_ENCODINGS = {
+    'utf-8': UTF8Encoding(False),
+    'utf-16': UnicodeEncoding(False, True),
+}
+
+# Строка таблицы HTML отчёта
+REPORT_ROW_TMPL = (
+    u"<tr><td>{0}</td><td class='fop-param'>{1}</td><td>{2}</td>"
+    u"<td class='{3}'>{4}</td><td>{5}</td><td>{6}</td></tr>"
+)
+
+# Переносы строк в инструкциях IDS: \n -> пробел, \r удаляется
+_INSTR_TRANS = {ord(u"\n"): u" ", ord(u"\r"): None}
+
+
+def _write_lines(output_path, encoding, lines):
+    """Записать строки через перевод строки порциями, без одной большой строки."""
+    writer = StreamWriter(output_path, False, WRITE_ENCODINGS[encoding], WRITE_BUFFER_SIZE)
+    try:
+        for start in range(0, len(lines), WRITE_CHUNK_LINES):
+            if start:
+                writer.Write("\n")
+            writer.Write("\n".join(lines[start:start + WRITE_CHUNK_LINES]))
+    finally:
+        writer.Close()
+
+
+def _build_fop_description(prop):
+    """Описание параметра для ФОП: инструкции из IDS + enumeration."""
+    instr = prop.instructions
+    enums = prop.enumeration
+
+    # Частый случай - ни инструкций, ни допустимых значений
+    if not instr and not enums:
+        return ""
+
+    desc_parts = []
+
+    # Инструкции (подсказка из IDS)
+    if instr:
+        # Убираем переносы строк для ФОП
+        desc_parts.append(instr.translate(_INSTR_TRANS).strip())
+
+    # Допустимые значения
+    if enums:
+        enum_str = "Values: " + ", ".join(enums[:10])
+        if len(enums) > 10:
+            enum_str += "..."
+        desc_parts.append(enum_str)
+
+    return " | ".join(desc_parts)
 
 
 # === ПАРСЕР IDS ===
 
+class IDSProp(object):
+    """Требование к параметру из IDS."""
+
+    __slots__ = (
+        "baseName", "propertySet", "dataType", "cardinality", "enumeration",
+        "instructions", "entities", "_entset", "_fop_description", "_revit_dtype"
+    )
+
+    def __init__(self, data_type="IFCTEXT", cardinality="required", instructions=""):
+        self.propertySet = ""
+        self.baseName = ""
+        self.dataType = data_type
+        self.cardinality = cardinality
+        self.enumeration = None
+        self.instructions = instructions
+        self.entities = ()
+        self._entset = None
+        self._fop_description = ""
+        self._revit_dtype = "TEXT"
+
+    def copy(self):
+        """Копия требования из IDS (без сущностей)."""
+        prop = IDSProp(self.dataType, self.cardinality, self.instructions)
+        prop.propertySet = self.propertySet
+        prop.baseName = self.baseName
+        prop.enumeration = self.enumeration
+        return prop
+
+    def to_state(self):
+        """Значения всех полей кортежем (для кэша IDS - только встроенные типы)."""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    @classmethod
+    def from_state(cls, state):
+        """Создать требование из кортежа to_state()."""
+        prop = cls()
+        for name, value in zip(cls.__slots__, state):
+            setattr(prop, name, value)
+        return prop
+
+
 class IDSParser:
     """Парсер IDS файла."""
 
+    # Вид результата в кэше IDS (у FOPtoProject свой формат данных).
+    # При изменении правил разбора сменить суффикс - старый кэш не подойдёт
+    CACHE_KIND = "ids_to_fop_v2"
+
     def __init__(self, ids_path):
         self.ids_path = ids_path
         self.specifications = []
@@ -77,135 +205,255 @@ class IDSParser:
         self.all_properties_full = []  # ВСЕ параметры с учётом PropertySet (для Mapping/Report)
         self.property_sets = {}        # PropertySet -> [properties]
         self.property_sets_full = {}   # PropertySet -> [properties] (полный, для Mapping/Report)
+        self.sorted_psets = []         # Отсортированные ключи property_sets
+        self.sorted_psets_full = []    # Отсортированные ключи property_sets_full
 
     def parse(self):
-        """Парсить IDS файл."""
-        doc = XmlDocument()
-        doc.Load(self.ids_path)
-
-        # Namespace manager для IDS
-        nsm = XmlNamespaceManager(doc.NameTable)
-        nsm.AddNamespace("ids", "http://standards.buildingsmart.org/IDS")
-        nsm.AddNamespace("xs", "http://www.w3.org/2001/XMLSchema")
-
-        # Найти все specifications
-        spec_nodes = doc.SelectNodes("//ids:specification", nsm)
-
-        for spec_node in spec_nodes:
-            spec = self._parse_specification(spec_node, nsm)
-            self.specifications.append(spec)
+        """Парсить IDS файл (или взять результат из кэша, если файл не изменился)."""
+        cached = load_cached(self.ids_path, self.CACHE_KIND)
+        if cached is not None:
+            Logger.info(SCRIPT_NAME, "IDS взят из кэша")
+            self._restore_cached(cached)
+            return self
+
+        if _HAS_LXML:
+            self._parse_lxml()
+        else:
+            self._parse_sysxml()
 
         # Собрать уникальные параметры
         self._collect_unique_properties()
 
+        # Пустой результат не кэшируем
+        if self.all_properties:
+            save_cached(self.ids_path, self.CACHE_KIND, (
+                [prop.to_state() for prop in self.all_properties],
+                [prop.to_state() for prop in self.all_properties_full],
+            ))
+
         return self
 
-    def _parse_specification(self, spec_node, nsm):
-        """Парсить одну спецификацию."""
+    def _restore_cached(self, cached):
+        """Восстановить параметры из кэша; группы строятся в том же порядке."""
+        states, states_full = cached
+        self.all_properties = [IDSProp.from_state(state) for state in states]
+        self.all_properties_full = [IDSProp.from_state(state) for state in states_full]
+        for prop in self.all_properties:
+            self.property_sets.setdefault(prop.propertySet, []).append(prop)
+        for prop in self.all_properties_full:
+            self.property_sets_full.setdefault(prop.propertySet, []).append(prop)
+        self.sorted_psets = sorted(self.property_sets)
+        self.sorted_psets_full = sorted(self.property_sets_full)
+
+    def _parse_lxml(self):
+        """Парсить IDS через lxml iterparse по спецификациям."""
+        spec_tag = "{" + IDS_NS + "}specification"
+        for _event, elem in _etree.iterparse(self.ids_path, events=("end",), tag=spec_tag):
+            self.specifications.append(self._parse_spec_element(elem))
+            # Освобождаем разобранные узлы - память не растёт с размером файла
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    def _parse_spec_element(self, elem):
+        """Парсить элемент specification (lxml)."""
         spec = {
-            "name": spec_node.GetAttribute("name") or "",
+            "name": elem.get("name") or "",
             "applicability": [],
             "requirements": []
         }
 
         # Applicability - к каким элементам применяется
-        entity_nodes = spec_node.SelectNodes("ids:applicability/ids:entity", nsm)
-        for entity_node in entity_nodes:
-            # Сначала пробуем simpleValue
-            name_simple = entity_node.SelectSingleNode("ids:name/ids:simpleValue", nsm)
-            if name_simple and name_simple.InnerText:
-                entity = name_simple.InnerText.strip().upper()
-                if entity and entity not in spec["applicability"]:
+        app_seen = set()
+        for entity_el in _XP_ENTITY(elem):
+            simple = _XP_ENTITY_SIMPLE(entity_el)
+            if simple and simple[0].text:
+                values = [simple[0].text]
+            else:
+                values = _XP_ENTITY_ENUM(entity_el)
+            for val in values:
+                entity = val.strip().upper()
+                if entity and entity not in app_seen:
+                    app_seen.add(entity)
                     spec["applicability"].append(entity)
+
+        # Requirements - требуемые параметры
+        for prop_el in _XP_PROPERTY(elem):
+            prop = self._new_property(prop_el.get)
+
+            pset_nodes = _XP_PSET(prop_el)
+            if pset_nodes:
+                prop.propertySet = pset_nodes[0].text or ""
+
+            name_nodes = _XP_NAME_SIMPLE(prop_el)
+            if name_nodes:
+                prop.baseName = name_nodes[0].text or ""
             else:
-                # Пробуем xs:restriction/xs:enumeration
-                enum_nodes = entity_node.SelectNodes("ids:name/xs:restriction/xs:enumeration", nsm)
-                for enum_node in enum_nodes:
-                    val = enum_node.GetAttribute("value")
+                for val in _XP_NAME_ENUM(prop_el):
                     if val:
-                        entity = val.strip().upper()
-                        if entity and entity not in spec["applicability"]:
-                            spec["applicability"].append(entity)
+                        prop.baseName = val
+                        break
 
-        # Requirements - требуемые параметры
-        req_nodes = spec_node.SelectNodes("ids:requirements/ids:property", nsm)
-        for req_node in req_nodes:
-            prop = self._parse_property(req_node, nsm)
-            if prop:
+            enum_nodes = _XP_VALUE_ENUM_XS(prop_el) or _XP_VALUE_ENUM_IDS(prop_el)
+            values = [node.get("value") for node in enum_nodes if node.get("value")]
+            if values:
+                prop.enumeration = values
+
+            if prop.baseName:
                 spec["requirements"].append(prop)
 
         return spec
 
-    def _parse_property(self, prop_node, nsm):
-        """Парсить требование к параметру."""
-        prop = {
-            "propertySet": "",
-            "baseName": "",
-            "dataType": "IFCTEXT",
-            "cardinality": "required",
-            "enumeration": None,
-            "instructions": ""
-        }
-
-        # PropertySet
-        pset_node = prop_node.SelectSingleNode("ids:propertySet/ids:simpleValue", nsm)
-        if pset_node:
-            prop["propertySet"] = pset_node.InnerText
-
-        # BaseName (имя параметра)
-        # Сначала пробуем simpleValue
-        name_node = prop_node.SelectSingleNode("ids:baseName/ids:simpleValue", nsm)
-        if name_node:
-            prop["baseName"] = name_node.InnerText
-        else:
-            # Если нет simpleValue, пробуем xs:enumeration (первое значение)
-            enum_node = prop_node.SelectSingleNode("ids:baseName/xs:restriction/xs:enumeration", nsm)
-            if enum_node:
-                val = enum_node.GetAttribute("value")
-                if val:
-                    prop["baseName"] = val
-                    Logger.debug(SCRIPT_NAME, "  baseName из enumeration: {}".format(val))
-
-        # DataType
-        datatype_attr = prop_node.GetAttribute("dataType")
-        if datatype_attr:
-            prop["dataType"] = datatype_attr.upper()
-
-        # Cardinality (required/optional)
-        cardinality = prop_node.GetAttribute("cardinality")
-        if cardinality:
-            prop["cardinality"] = cardinality
-
-        # Instructions (подсказка)
-        instr_attr = prop_node.GetAttribute("instructions")
-        if instr_attr:
-            prop["instructions"] = instr_attr
-
-        # Enumeration (допустимые значения)
-        # В IDS файлах enumeration может быть с namespace xs: или ids:
-        # Пробуем оба варианта
-        enum_nodes = prop_node.SelectNodes("ids:value/xs:restriction/xs:enumeration", nsm)
-        if not enum_nodes or enum_nodes.Count == 0:
-            enum_nodes = prop_node.SelectNodes("ids:value/ids:restriction/ids:enumeration", nsm)
-        if enum_nodes and enum_nodes.Count > 0:
-            enums = []
-            for enum_node in enum_nodes:
-                val = enum_node.GetAttribute("value")
-                if val:
-                    enums.append(val)
-            if enums:
-                prop["enumeration"] = enums
-
-        return prop if prop["baseName"] else None
-
-    def _get_simple_value(self, node):
-        """Получить простое значение из узла."""
-        if node is None:
-            return None
-        # Попробовать simpleValue
-        if node.InnerText:
-            return node.InnerText
-        return None
+    def _new_property(self, get_attr):
+        """Новое требование к параметру с атрибутами элемента property."""
+        return IDSProp(
+            (get_attr("dataType") or "IFCTEXT").upper(),
+            get_attr("cardinality") or "required",
+            get_attr("instructions") or ""
+        )
+
+    def _parse_sysxml(self):
+        """Парсить IDS файл за один проход XmlReader."""
+        clr.AddReference('System.Xml')
+        from System.Xml import XmlReader, XmlReaderSettings, XmlNodeType, DtdProcessing
+
+        settings = XmlReaderSettings()
+        settings.IgnoreComments = True
+        settings.IgnoreProcessingInstructions = True
+        settings.IgnoreWhitespace = True
+        settings.DtdProcessing = DtdProcessing.Ignore
+
+        self._spec = None     # Текущая спецификация
+        self._entity = None   # Текущая сущность из applicability
+        self._prop = None     # Текущее требование к параметру
+        self._text = []       # Текст текущего simpleValue
+        self._debug = Logger.is_debug_enabled()
+
+        reader = XmlReader.Create(self.ids_path, settings)
+        try:
+            path = []  # Стек локальных имён открытых элементов
+            while reader.Read():
+                node_type = reader.NodeType
+                if node_type == XmlNodeType.Element:
+                    # Элементы XML Schema помечаются префиксом "xs:" -
+                    # xs:enumeration и ids:enumeration обрабатываются по-разному
+                    namespace = reader.NamespaceURI
+                    if namespace == IDS_NS:
+                        path.append(reader.LocalName)
+                    elif namespace == XS_NS:
+                        path.append("xs:" + reader.LocalName)
+                    else:
+                        path.append("")
+                    self._on_start(reader, path)
+                    if not reader.IsEmptyElement:
+                        continue
+                elif node_type == XmlNodeType.Text or node_type == XmlNodeType.CDATA:
+                    self._text.append(reader.Value)
+                    continue
+                elif node_type != XmlNodeType.EndElement:
+                    continue
+
+                # Закрытие элемента (EndElement или пустой элемент)
+                self._on_end(path)
+                path.pop()
+        finally:
+            reader.Close()
+
+    def _on_start(self, reader, path):
+        """Открытие элемента IDS."""
+        name = path[-1]
+        parent = path[-2] if len(path) > 1 else ""
+
+        if name == "specification":
+            self._spec = {
+                "name": reader.GetAttribute("name") or "",
+                "applicability": [],
+                "requirements": []
+            }
+            self._app_seen = set()
+        elif self._spec is None:
+            return
+        elif name == "entity" and parent == "applicability":
+            # Applicability - к каким элементам применяется
+            self._entity = {"simple": None, "enums": []}
+        elif name == "property" and parent == "requirements":
+            # Requirements - требуемые параметры
+            self._prop = self._new_property(reader.GetAttribute)
+            self._prop_name_simple = False
+            self._prop_name_enum = None
+            self._prop_values = []      # Значения xs:enumeration
+            self._prop_values_ids = []  # Значения ids:enumeration
+            self._prop_xs_enum = False  # Встречался ли xs:enumeration в ids:value
+        elif name == "simpleValue":
+            self._text = []
+        elif name == "xs:enumeration" and parent == "xs:restriction" and len(path) > 3:
+            owner = path[-3]
+            if owner == "value" and self._prop is not None:
+                # Enumeration (допустимые значения)
+                self._prop_xs_enum = True
+            val = reader.GetAttribute("value")
+            if not val:
+                return
+            if owner == "name" and path[-4] == "entity" and self._entity is not None:
+                self._entity["enums"].append(val)
+            elif owner == "baseName" and self._prop is not None:
+                # Если нет simpleValue, берём первое значение enumeration
+                if self._prop_name_enum is None:
+                    self._prop_name_enum = val
+            elif owner == "value" and self._prop is not None:
+                self._prop_values.append(val)
+        elif (name == "enumeration" and parent == "restriction" and len(path) > 3
+                and path[-3] == "value" and self._prop is not None):
+            # ids:restriction/ids:enumeration - только если нет xs:enumeration
+            val = reader.GetAttribute("value")
+            if val:
+                self._prop_values_ids.append(val)
+
+    def _on_end(self, path):
+        """Закрытие элемента IDS."""
+        name = path[-1]
+        spec = self._spec
+        if spec is None:
+            return
+
+        if name == "simpleValue" and len(path) > 2:
+            owner = path[-2]
+            text = "".join(self._text)
+            if owner == "name" and path[-3] == "entity" and self._entity is not None:
+                self._entity["simple"] = text
+            elif path[-3] == "property" and self._prop is not None:
+                if owner == "propertySet":
+                    self._prop.propertySet = text
+                elif owner == "baseName":
+                    self._prop.baseName = text
+                    self._prop_name_simple = True
+        elif name == "entity" and self._entity is not None:
+            # Сначала simpleValue, иначе xs:restriction/xs:enumeration
+            if self._entity["simple"]:
+                values = [self._entity["simple"]]
+            else:
+                values = self._entity["enums"]
+            for val in values:
+                entity = val.strip().upper()
+                if entity and entity not in self._app_seen:
+                    self._app_seen.add(entity)
+                    spec["applicability"].append(entity)
+            self._entity = None
+        elif name == "property" and self._prop is not None:
+            prop = self._prop
+            if not self._prop_name_simple and self._prop_name_enum:
+                prop.baseName = self._prop_name_enum
+                if self._debug:
+                    Logger.debug(SCRIPT_NAME, "  baseName из enumeration: {}".format(self._prop_name_enum))
+            values = self._prop_values if self._prop_xs_enum else self._prop_values_ids
+            if values:
+                prop.enumeration = values
+            if prop.baseName:
+                spec["requirements"].append(prop)
+            self._prop = None
+        elif name == "specification":
+            self.specifications.append(spec)
+            self._spec = None
 
     def _collect_unique_properties(self):
         """Собрать параметры из всех спецификаций.
@@ -223,72 +471,91 @@ class IDSParser:
         duplicates_full = 0
 
         Logger.info(SCRIPT_NAME, "Сбор параметров из {} спецификаций".format(len(self.specifications)))
+        debug = Logger.is_debug_enabled()
 
         for spec in self.specifications:
             entities = spec["applicability"]
 
             for prop in spec["requirements"]:
-                base_name = prop["baseName"]
-                pset = prop["propertySet"]
+                base_name = prop.baseName
+                pset = prop.propertySet
+                key_full = (pset, base_name)
+
+                existing = seen_by_name.get(base_name)
+                existing_full = seen_by_pset_name.get(key_full)
 
                 # === 1. Для ФОП (уникальность по имени) ===
-                if base_name not in seen_by_name:
-                    prop_copy = dict(prop)
-                    prop_copy["entities"] = list(entities)
+                if existing is None:
+                    prop_copy = self._copy_property(prop, entities)
+                    prop_copy._fop_description = _build_fop_description(prop)
+                    prop_copy._revit_dtype = IFC_TO_REVIT_TYPE.get(prop.dataType, "TEXT")
                     seen_by_name[base_name] = prop_copy
                     self.all_properties.append(prop_copy)
+                    self.property_sets.setdefault(pset, []).append(prop_copy)
 
-                    if pset not in self.property_sets:
-                        self.property_sets[pset] = []
-                    self.property_sets[pset].append(prop_copy)
-
-                    Logger.debug(SCRIPT_NAME, "  + ФОП: {} (PropertySet: {})".format(base_name, pset))
+                    if debug:
+                        Logger.debug(SCRIPT_NAME, "  + ФОП: {} (PropertySet: {})".format(base_name, pset))
                 else:
                     duplicates_fop += 1
-                    existing = seen_by_name[base_name]
-                    for ent in entities:
-                        if ent not in existing["entities"]:
-                            existing["entities"].append(ent)
+                    self._merge_entities(existing, entities)
 
                 # === 2. Для Mapping/Report (уникальность по PropertySet + имя) ===
-                key_full = (pset, base_name)
-                if key_full not in seen_by_pset_name:
-                    prop_copy_full = dict(prop)
-                    prop_copy_full["entities"] = list(entities)
+                if existing_full is None:
+                    prop_copy_full = self._copy_property(prop, entities)
                     seen_by_pset_name[key_full] = prop_copy_full
                     self.all_properties_full.append(prop_copy_full)
-
-                    if pset not in self.property_sets_full:
-                        self.property_sets_full[pset] = []
-                    self.property_sets_full[pset].append(prop_copy_full)
+                    self.property_sets_full.setdefault(pset, []).append(prop_copy_full)
                 else:
                     duplicates_full += 1
-                    existing_full = seen_by_pset_name[key_full]
-                    for ent in entities:
-                        if ent not in existing_full["entities"]:
-                            existing_full["entities"].append(ent)
+                    self._merge_entities(existing_full, entities)
 
         Logger.info(SCRIPT_NAME, "Параметров для ФОП (уникальных по имени): {}".format(len(self.all_properties)))
         Logger.info(SCRIPT_NAME, "Параметров для Mapping/Report (с PropertySet): {}".format(len(self.all_properties_full)))
         Logger.info(SCRIPT_NAME, "Пропущено дубликатов (ФОП): {}".format(duplicates_fop))
         Logger.info(SCRIPT_NAME, "Пропущено дубликатов (Mapping): {}".format(duplicates_full))
 
+        # Порядок групп общий для всех генераторов
+        self.sorted_psets = sorted(self.property_sets)
+        self.sorted_psets_full = sorted(self.property_sets_full)
+
+    def _copy_property(self, prop, entities):
+        """Копия требования со своим списком сущностей.
+
+        Копии для ФОП и для Mapping не общие: сущности в них сливаются по-разному.
+        """
+        prop_copy = prop.copy()
+        prop_copy.entities = list(entities)
+        prop_copy._entset = set(entities)
+        return prop_copy
+
+    def _merge_entities(self, existing, entities):
+        """Добавить новые сущности к уже собранному параметру."""
+        existing_set = existing._entset
+        for ent in entities:
+            if ent not in existing_set:
+                existing_set.add(ent)
+                existing.entities.append(ent)
+
 
 # === ГЕНЕРАТОР ФОП ===
 
 class FOPGenerator:
     """Генератор файла общих параметров Revit."""
 
-    def __init__(self, properties, property_sets, prefix=""):
+    def __init__(self, properties, property_sets, prefix="", sorted_psets=None):
         self.properties = properties
         self.property_sets = property_sets
+        self.sorted_psets = sorted_psets if sorted_psets is not None else sorted(property_sets)
         self.prefix = prefix.strip()
+        self._prefix_cache = {}  # имя -> имя с префиксом
 
     def _apply_prefix(self, name):
         """Добавить префикс к имени параметра."""
-        if self.prefix:
-            return "{}_{}".format(self.prefix, name)
-        return name
+        result = self._prefix_cache.get(name)
+        if result is None:
+            result = (self.prefix + "_" + name) if self.prefix else name
+            self._prefix_cache[name] = result
+        return result
 
     def generate(self, output_path):
         """Сгенерировать ФОП файл."""
@@ -309,7 +576,7 @@ class FOPGenerator:
 
         # Группы (PropertySets)
         group_ids = {}
-        for i, pset in enumerate(sorted(self.property_sets.keys()), 1):
+        for i, pset in enumerate(self.sorted_psets, 1):
             group_ids[pset] = i
             lines.append("GROUP\t{}\t{}".format(i, pset))
 
@@ -318,29 +585,17 @@ class FOPGenerator:
         # Параметры
         lines.append("*PARAM\tGUID\tNAME\tDATATYPE\tDATACATEGORY\tGROUP\tVISIBLE\tDESCRIPTION\tUSERMODIFIABLE\tHIDEWHENNOVALUE")
 
-        for prop in self.properties:
-            guid = str(uuid.uuid4()).upper()
-            name = self._apply_prefix(prop["baseName"])
-            datatype = IFC_TO_REVIT_TYPE.get(prop["dataType"], "TEXT")
-            group_id = group_ids.get(prop["propertySet"], 1)
+        debug = Logger.is_debug_enabled()
 
-            # Описание: инструкции из IDS + enumeration
-            desc_parts = []
+        # GUID генерируются в .NET, без uuid4 на каждый параметр
+        guids = [Guid.NewGuid().ToString("D").ToUpperInvariant() for _ in self.properties]
 
-            # Инструкции (подсказка из IDS)
-            if prop.get("instructions"):
-                # Убираем переносы строк для ФОП
-                instr = prop["instructions"].replace("\n", " ").replace("\r", "").strip()
-                desc_parts.append(instr)
-
-            # Допустимые значения
-            if prop.get("enumeration"):
-                enum_str = "Values: " + ", ".join(prop["enumeration"][:10])
-                if len(prop["enumeration"]) > 10:
-                    enum_str += "..."
-                desc_parts.append(enum_str)
-
-            description = " | ".join(desc_parts) if desc_parts else ""
+        lines_append = lines.append
+        for prop, guid in zip(self.properties, guids):
+            name = self._apply_prefix(prop.baseName)
+            datatype = prop._revit_dtype
+            group_id = group_ids.get(prop.propertySet, 1)
+            description = prop._fop_description
 
             line = "PARAM\t{guid}\t{name}\t{dtype}\t\t{group}\t1\t{desc}\t1\t0".format(
                 guid=guid,
@@ -349,13 +604,13 @@ class FOPGenerator:
                 group=group_id,
                 desc=description
             )
-            lines.append(line)
+            lines_append(line)
 
-            Logger.debug(SCRIPT_NAME, "  Параметр: {} | {} | группа: {}".format(name, datatype, prop["propertySet"]))
+            if debug:
+                Logger.debug(SCRIPT_NAME, "  Параметр: {} | {} | группа: {}".format(name, datatype, prop.propertySet))
 
         # Записать файл в UTF-16 LE с BOM (требование Revit!)
-        with codecs.open(output_path, 'w', 'utf-16') as f:
-            f.write("\n".join(lines))
+        _write_lines(output_path, 'utf-16', lines)
 
         Logger.info(SCRIPT_NAME, "ФОП файл создан: {} параметров".format(len(self.properties)))
         return len(self.properties)
@@ -366,16 +621,21 @@ class FOPGenerator:
 class IFCMappingGenerator:
     """Генератор файла маппинга IFC параметров."""
 
-    def __init__(self, properties, property_sets, prefix=""):
+    def __init__(self, properties, property_sets, prefix="", sorted_psets=None):
         self.properties = properties
         self.property_sets = property_sets
+        self.sorted_psets = sorted_psets if sorted_psets is not None else sorted(property_sets)
         self.prefix = prefix.strip()
+        self._prefix_cache = {}  # имя -> имя с префиксом
+        self._class_cache = {}  # имя из IDS -> IfcXxx
 
     def _apply_prefix(self, name):
         """Добавить префикс к имени параметра."""
-        if self.prefix:
-            return "{}_{}".format(self.prefix, name)
-        return name
+        result = self._prefix_cache.get(name)
+        if result is None:
+            result = (self.prefix + "_" + name) if self.prefix else name
+            self._prefix_cache[name] = result
+        return result
 
     def _convert_ifc_class_name(self, ifc_name):
         """
@@ -385,60 +645,19 @@ class IFCMappingGenerator:
         IFCWALLTYPE -> IfcWallType
         IFCWALLSTANDARDCASE -> IfcWallStandardCase
         """
+        cached = self._class_cache.get(ifc_name)
+        if cached is not None:
+            return cached
+
         name = ifc_name.upper()
         if not name.startswith("IFC"):
-            return ifc_name
-
-        # Убираем префикс IFC
-        rest = name[3:]
-
-        # Словарь известных составных имён
-        known_compounds = {
-            "WALLTYPE": "WallType",
-            "WALLSTANDARDCASE": "WallStandardCase",
-            "WALLELEMENTEDCASE": "WallElementedCase",
-            "SLABTYPE": "SlabType",
-            "SLABSTANDARDCASE": "SlabStandardCase",
-            "SLABELEMENTEDCASE": "SlabElementedCase",
-            "BEAMTYPE": "BeamType",
-            "BEAMSTANDARDCASE": "BeamStandardCase",
-            "COLUMNTYPE": "ColumnType",
-            "COLUMNSTANDARDCASE": "ColumnStandardCase",
-            "MEMBERTYPE": "MemberType",
-            "MEMBERSTANDARDCASE": "MemberStandardCase",
-            "PLATETYPE": "PlateType",
-            "PLATESTANDARDCASE": "PlateStandardCase",
-            "FOOTINGTYPE": "FootingType",
-            "PILETYPE": "PileType",
-            "REINFORCINGBAR": "ReinforcingBar",
-            "REINFORCINGBARTYPE": "ReinforcingBarType",
-            "REINFORCINGMESH": "ReinforcingMesh",
-            "REINFORCINGMESHTYPE": "ReinforcingMeshType",
-            "ELEMENTASSEMBLY": "ElementAssembly",
-            "ELEMENTASSEMBLYTYPE": "ElementAssemblyType",
-            "BUILDINGELEMENTPROXY": "BuildingElementProxy",
-            "BUILDINGELEMENTPROXYTYPE": "BuildingElementProxyType",
-            "DOORTYPE": "DoorType",
-            "DOORSTANDARDCASE": "DoorStandardCase",
-            "WINDOWTYPE": "WindowType",
-            "WINDOWSTANDARDCASE": "WindowStandardCase",
-            "STAIRTYPE": "StairType",
-            "STAIRFLIGHT": "StairFlight",
-            "STAIRFLIGHTTYPE": "StairFlightType",
-            "RAMPTYPE": "RampType",
-            "RAMPFLIGHT": "RampFlight",
-            "RAMPFLIGHTTYPE": "RampFlightType",
-            "RAILINGTYPE": "RailingType",
-            "ROOFTYPE": "RoofType",
-            "CURTAINWALLTYPE": "CurtainWallType",
-            "COVERINGTYPE": "CoveringType",
-        }
-
-        if rest in known_compounds:
-            return "Ifc" + known_compounds[rest]
+            result = ifc_name
+        else:
+            # Составные имена - из таблицы, простые - capitalize
+            result = IFC_ENTITY_CANONICAL.get(name) or ("Ifc" + name[3:].capitalize())
 
-        # Простые имена - просто capitalize
-        return "Ifc" + rest.capitalize()
+        self._class_cache[ifc_name] = result
+        return result
 
     def generate(self, output_path):
         """
@@ -449,66 +668,39 @@ class IFCMappingGenerator:
         	<IFC Property Name>	<Type>	<Revit Param Name>
         """
         lines = []
+        lines_append = lines.append
 
-        # Группируем по PropertySet и собираем все IFC классы для каждого PropertySet
-        pset_entities = {}  # PropertySet -> set of IFC entities
-        pset_props = {}     # PropertySet -> list of properties
-
-        for pset in self.property_sets.keys():
-            pset_entities[pset] = set()
-            pset_props[pset] = []
+        for pset in self.sorted_psets:
+            props = self.property_sets[pset]
 
-            for prop in self.property_sets[pset]:
-                entities = prop.get("entities", [])
-                for ent in entities:
-                    # Конвертируем в правильный формат IfcXxx
-                    ifc_class = self._convert_ifc_class_name(ent)
-                    pset_entities[pset].add(ifc_class)
-
-                pset_props[pset].append(prop)
+            # Все сущности из IDS для PropertySet (каждая один раз)
+            entities = set()
+            for prop in props:
+                entities.update(prop.entities)
 
-        # Генерируем файл
-        for pset in sorted(self.property_sets.keys()):
-            # Список IFC классов
-            ifc_classes = sorted(pset_entities[pset])
-            if not ifc_classes:
-                ifc_classes = ["IfcBuildingElement"]
+            # Конвертируем в правильный формат IfcXxx
+            ifc_set = set(self._convert_ifc_class_name(ent) for ent in entities)
+            ifc_classes = sorted(ifc_set) or ["IfcBuildingElement"]
 
             # Строка PropertySet
-            lines.append("PropertySet:\t{}\tI\t{}".format(pset, ",".join(ifc_classes)))
+            lines_append("PropertySet:\t" + pset + "\tI\t" + ",".join(ifc_classes))
 
             # Параметры (с отступом TAB)
-            for prop in pset_props[pset]:
-                ifc_prop_name = prop["baseName"]
-                revit_param = self._apply_prefix(prop["baseName"])
-
-                # Получаем тип из IFC dataType и конвертируем в формат IFC Mapping
-                ifc_datatype = prop.get("dataType", "IFCTEXT").upper()
-                revit_type = IFC_TO_REVIT_TYPE.get(ifc_datatype, "TEXT")
-
-                # Конвертируем Revit тип в формат IFC Mapping файла
-                # IFC Mapping использует: Text, Real, Integer, Boolean, Length, Area, Volume, Angle
-                mapping_type_map = {
-                    "TEXT": "Text",
-                    "YESNO": "Boolean",
-                    "INTEGER": "Integer",
-                    "NUMBER": "Real",
-                    "LENGTH": "Length",
-                    "AREA": "Area",
-                    "VOLUME": "Volume",
-                    "ANGLE": "Angle",
-                }
-                dtype = mapping_type_map.get(revit_type, "Text")
+            for prop in props:
+                base_name = prop.baseName
+
+                # Тип из IFC dataType -> тип Revit -> тип IFC Mapping
+                revit_type = IFC_TO_REVIT_TYPE.get(prop.dataType, "TEXT")
+                dtype = IFC_MAPPING_TYPES.get(revit_type, "Text")
 
                 # Формат: TAB + IFC Property Name + TAB + Type + TAB + Revit Param Name
-                lines.append("\t{}\t{}\t{}".format(ifc_prop_name, dtype, revit_param))
+                lines_append("\t" + base_name + "\t" + dtype + "\t" + self._apply_prefix(base_name))
 
             # Пустая строка между PropertySets
-            lines.append("")
+            lines_append("")
 
         # Записать файл
-        with codecs.open(output_path, 'w', 'utf-8') as f:
-            f.write("\n".join(lines))
+        _write_lines(output_path, 'utf-8', lines)
 
         return len(self.properties)
 
@@ -521,16 +713,20 @@ class ReportGenerator:
     def __init__(self, parser, prefix=""):
         self.parser = parser
         self.prefix = prefix.strip()
+        self._prefix_cache = {}  # имя -> имя с префиксом
 
     def _apply_prefix(self, name):
         """Добавить префикс к имени параметра."""
-        if self.prefix:
-            return "{}_{}".format(self.prefix, name)
-        return name
+        result = self._prefix_cache.get(name)
+        if result is None:
+            result = (self.prefix + "_" + name) if self.prefix else name
+            self._prefix_cache[name] = result
+        return result
 
     def generate(self, output_path):
         """Сгенерировать HTML отчёт."""
         html = []
+        html_append = html.append
         html.append("<!DOCTYPE html>")
         html.append("<html><head>")
         html.append("<meta charset='utf-8'>")
@@ -555,48 +751,56 @@ class ReportGenerator:
         html.append("<p>Total Parameters: {}</p>".format(len(self.parser.all_properties_full)))
 
         # Таблица по PropertySets (используем полный список с учётом PropertySet)
-        for pset in sorted(self.parser.property_sets_full.keys()):
+        for pset in self.parser.sorted_psets_full:
             props = self.parser.property_sets_full[pset]
             html.append("<h2>{} ({} params)</h2>".format(pset, len(props)))
             html.append("<table>")
             html.append("<tr><th>IDS Parameter</th><th>FOP Parameter</th><th>Type</th><th>Required</th><th>Entities</th><th>Allowed Values</th></tr>")
 
             for prop in props:
-                req_class = "required" if prop["cardinality"] == "required" else "optional"
-                req_text = "Yes" if prop["cardinality"] == "required" else "No"
-                entities = ", ".join(prop.get("entities", [])[:3])
-                if len(prop.get("entities", [])) > 3:
+                req_class = "required" if prop.cardinality == "required" else "optional"
+                req_text = "Yes" if prop.cardinality == "required" else "No"
+                entities = ", ".join(prop.entities[:3])
+                if len(prop.entities) > 3:
                     entities += "..."
 
                 # Допустимые значения из enumeration
-                enum_list = prop.get("enumeration") or []
+                enum_list = prop.enumeration or []
                 if enum_list:
                     values = ", ".join(enum_list)
                 else:
                     values = "-"
 
                 # Имя параметра в ФОП (с префиксом)
-                fop_param = self._apply_prefix(prop["baseName"])
+                fop_param = self._apply_prefix(prop.baseName)
 
-                html.append("<tr>")
-                html.append("<td>{}</td>".format(prop["baseName"]))
-                html.append("<td class='fop-param'>{}</td>".format(fop_param))
-                html.append("<td>{}</td>".format(prop["dataType"]))
-                html.append("<td class='{}'>{}</td>".format(req_class, req_text))
-                html.append("<td>{}</td>".format(entities))
-                html.append("<td>{}</td>".format(values))
-                html.append("</tr>")
+                html_append(REPORT_ROW_TMPL.format(
+                    prop.baseName, fop_param, prop.dataType,
+                    req_class, req_text, entities, values
+                ))
 
             html.append("</table>")
 
         html.append("</body></html>")
 
-        with codecs.open(output_path, 'w', 'utf-8') as f:
-            f.write("\n".join(html))
+        _write_lines(output_path, 'utf-8', html)
 
 
 # === ГЛАВНОЕ ОКНО ===
 
+# WinForms грузим только перед окном - парсеру и генераторам они не нужны
+clr.AddReference('System.Windows.Forms')
+clr.AddReference('System.Drawing')
+
+from System.Windows.Forms import (
+    Form, Label, TextBox, Button, CheckBox,
+    FormStartPosition, FormBorderStyle,
+    DialogResult, OpenFileDialog, FolderBrowserDialog,
+    GroupBox
+)
+from System.Drawing import Point, Size, Color
+
+
 class IDStoFOPForm(Form):
     """Диалог конвертации IDS в ФОП."""
 
@@ -812,14 +1016,16 @@ class IDStoFOPForm(Form):
             # ФОП - используем дедуплицированные по имени (all_properties)
             if self.chk_fop.Checked:
                 fop_path = os.path.join(self.output_folder, file_prefix + "_SharedParams.txt")
-                gen = FOPGenerator(parser.all_properties, parser.property_sets, prefix)
+                gen = FOPGenerator(parser.all_properties, parser.property_sets, prefix, parser.sorted_psets)
                 count = gen.generate(fop_path)
                 results.append("ФОП: {} параметров".format(count))
 
             # IFC Mapping - используем ПОЛНЫЙ список (all_properties_full)
             if self.chk_mapping.Checked:
                 map_path = os.path.join(self.output_folder, file_prefix + "_IFCMapping.txt")
-                gen = IFCMappingGenerator(parser.all_properties_full, parser.property_sets_full, prefix)
+                gen = IFCMappingGenerator(
+                    parser.all_properties_full, parser.property_sets_full, prefix, parser.sorted_psets_full
+                )
                 count = gen.generate(map_path)
                 results.append("IFC Mapping: {} параметров".format(count))
                 Logger.info(SCRIPT_NAME, "IFC Mapping создан: {} параметров".format(count))
@@ -10,33 +10,20 @@ __title__ = "ФОП в\nпроект"
 __author__ = "CPSK"
 
 import clr
+import codecs
+import json
 import os
+import re
 import sys
-import codecs
-
-clr.AddReference('System.Windows.Forms')
-clr.AddReference('System.Drawing')
+import tempfile
 
-import System
-from System.Windows.Forms import (
-    Form, Label, Button, Panel, CheckBox, ComboBox, ListBox,
-    DockStyle, FormStartPosition, FormBorderStyle,
-    DialogResult, OpenFileDialog,
-    SelectionMode, GroupBox, ScrollBars
-)
-from System.Drawing import Point, Size, Color, Font, FontStyle
+from pyrevit import revit, script
 
-from pyrevit import revit, forms, script
+# Добавляем support_files в путь для импорта ifc_mappings
+# (lib расширения pyRevit добавляет в sys.path сам - cpsk_paths доступен сразу)
+from cpsk_paths import SUPPORT_DIR, ensure_on_syspath
 
-# Добавляем lib и support_files в путь для импорта
-SCRIPT_DIR = os.path.dirname(__file__)
-EXTENSION_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(SCRIPT_DIR))))
-LIB_DIR = os.path.join(EXTENSION_DIR, "lib")
-SUPPORT_DIR = os.path.join(EXTENSION_DIR, "support_files")
-if LIB_DIR not in sys.path:
-    sys.path.insert(0, LIB_DIR)
-if SUPPORT_DIR not in sys.path:
-    sys.path.insert(0, SUPPORT_DIR)
+ensure_on_syspath(SUPPORT_DIR)
 
 # Импорт модулей из lib
 from cpsk_notify import show_error, show_warning, show_info, show_success
@@ -52,28 +39,33 @@ if not require_auth():
 if not require_environment():
     sys.exit()
 
-# Инициализация логгера (очищает лог при каждом запуске)
-SCRIPT_NAME = "FOPtoProject"
-Logger.init(SCRIPT_NAME)
-Logger.info(SCRIPT_NAME, "Скрипт запущен")
+# Тяжёлые .NET/Revit импорты - только после успешных проверок
+import System
+from System.IO import (
+    FileStream, FileMode, FileAccess, FileShare, FileOptions, StreamReader
+)
+from System.Text import Encoding, UTF8Encoding
+from System.Net import WebUtility
 
 # Revit API
 from Autodesk.Revit.DB import (
-    Transaction, BuiltInCategory, Category,
+    Transaction, SubTransaction, BuiltInCategory, Category,
     ExternalDefinitionCreationOptions,
-    CategorySet
+    CategorySet, IFailuresPreprocessor,
+    FailureProcessingResult, FailureSeverity
 )
 
-# BuiltInParameterGroup - разные версии Revit
-try:
-    from Autodesk.Revit.DB import BuiltInParameterGroup
-except ImportError:
-    # Revit 2024+ использует GroupTypeId
-    from Autodesk.Revit.DB import GroupTypeId as BuiltInParameterGroup
-
 # Импорт IFC маппингов из support_files
 from ifc_mappings import IFC_TO_REVIT_CATEGORY_IDS
 
+# Кэш разобранных IDS (пропуск парсинга при повторной загрузке того же файла)
+from cpsk_ids_cache import load_cached, save_cached
+
+# Инициализация логгера (заголовок сессии; лог очищается, если разросся)
+SCRIPT_NAME = "FOPtoProject"
+Logger.init(SCRIPT_NAME)
+Logger.info(SCRIPT_NAME, "Скрипт запущен")
+
 # === НАСТРОЙКИ ===
 
 doc = revit.doc
@@ -82,7 +74,8 @@ output = script.get_output()
 
 # IFC_TO_REVIT_CATEGORIES теперь импортируется из ifc_mappings.py
 # Формат: IFC_CLASS -> [(русское_имя, builtin_category_id), ...]
-IFC_TO_REVIT_CATEGORIES = IFC_TO_REVIT_CATEGORY_IDS
+# Ключи в верхнем регистре - IFC классы из IDS приводятся к нему при разборе
+IFC_TO_REVIT_CATEGORIES = dict((k.upper(), v) for k, v in IFC_TO_REVIT_CATEGORY_IDS.items())
 
 # Все категории для UI
 ALL_CATEGORIES = [
@@ -112,6 +105,66 @@ TYPE_PROPERTY_SETS = [
     "Pset_ReinforcingBarBendingsBECCommon",
 ]
 
+# Те же PropertySet в нижнем регистре (для сравнения без учёта регистра)
+_TYPE_PSETS_LOWER = tuple(s.lower() for s in TYPE_PROPERTY_SETS)
+
+# Пространства имён IDS и XML Schema
+IDS_NS = "http://standards.buildingsmart.org/IDS"
+XS_NS = "http://www.w3.org/2001/XMLSchema"
+
+# lxml (CPython) - потоковый iterparse, иначе XmlReader
+try:
+    from lxml import etree as _etree
+    _HAS_LXML = True
+except ImportError:
+    _HAS_LXML = False
+
+# Регулярные выражения IDS - компилируются один раз при загрузке модуля
+_RE_IFC_CLASS = re.compile(r'IFC\w+$')
+_RE_SPEC = re.compile(r'<specification[^>]*>(.*?)</specification>', re.DOTALL)
+_RE_IFC_SIMPLE = re.compile(r'<simpleValue>(IFC\w+)</simpleValue>')
+_RE_PROP = re.compile(r'<property([^>]*)>(.*?)</property>', re.DOTALL)
+_RE_INSTR = re.compile(r'instructions="([^"]*)"')
+_RE_DTYPE = re.compile(r'dataType="([^"]+)"')
+_RE_PSET = re.compile(r'<propertySet>.*?<simpleValue>([^<]+)</simpleValue>', re.DOTALL)
+_RE_BASENAME = re.compile(r'<baseName>.*?<simpleValue>([^<]+)</simpleValue>', re.DOTALL)
+_RE_VALUE = re.compile(r'<value>(.*?)</value>', re.DOTALL)
+_RE_ENUM = re.compile(r'<xs:enumeration value="([^"]+)"')
+
+# Кодировка IDS: UTF-8, ошибка на невалидных байтах (вместо тихой замены символов)
+IDS_ENCODING = UTF8Encoding(False, True)
+
+# Буфер чтения IDS/ФОП (1 МБ) - меньше обращений к диску на больших файлах
+READ_BUFFER_SIZE = 1 << 20
+
+# Вид результата в кэше IDS (у IDStoFOP свой формат данных).
+# is_type зависит от TYPE_PROPERTY_SETS - при их изменении сменить суффикс
+IDS_CACHE_KIND = "fop_to_project_v3"
+
+
+def open_read_stream(path):
+    """Открыть файл на последовательное чтение с большим буфером."""
+    return FileStream(path, FileMode.Open, FileAccess.Read, FileShare.Read,
+                      READ_BUFFER_SIZE, FileOptions.SequentialScan)
+
+
+def open_text_reader(path, encoding):
+    """StreamReader с большим буфером (BOM определяет кодировку, если есть)."""
+    return StreamReader(open_read_stream(path), encoding, True, READ_BUFFER_SIZE)
+
+
+def iter_text_lines(path, encoding):
+    """Строки текстового файла по одной (файл закрывается по окончании)."""
+    reader = open_text_reader(path, encoding)
+    try:
+        line = reader.ReadLine()
+        while line is not None:
+            yield line
+            line = reader.ReadLine()
+    finally:
+        reader.Close()
+
+
 # === ДИНАМИЧЕСКОЕ ПОЛУЧЕНИЕ ГРУПП ПАРАМЕТРОВ ===
 
 # Маппинг несоответствий API label -> UI label
@@ -121,8 +174,56 @@ LABEL_FIXES = {
 }
 
 
-def get_forge_type_id(g):
-    """Получить строковый ID из ForgeTypeId объекта."""
+# Кэш подписей групп между запусками: подписи зависят только от версии и языка Revit
+GROUP_LABELS_CACHE_FILE = os.path.join(
+    tempfile.gettempdir(),
+    "cpsk_group_labels_{}_{}.json".format(app.VersionNumber, app.Language))
+
+
+def _load_group_labels():
+    """Подписи групп из кэша: gid -> label (пустой dict, если кэша нет)."""
+    try:
+        with codecs.open(GROUP_LABELS_CACHE_FILE, 'r', 'utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_group_labels(labels):
+    """Атомарно сохранить подписи групп. Ошибки кэша не критичны."""
+    try:
+        tmp_path = GROUP_LABELS_CACHE_FILE + ".tmp"
+        with codecs.open(tmp_path, 'w', 'utf-8') as f:
+            f.write(json.dumps(labels, ensure_ascii=False))
+
+        # os.replace нет в IronPython 2.7, а os.rename на Windows не перезаписывает
+        if os.path.exists(GROUP_LABELS_CACHE_FILE):
+            os.remove(GROUP_LABELS_CACHE_FILE)
+        os.rename(tmp_path, GROUP_LABELS_CACHE_FILE)
+    except Exception:
+        return False
+    return True
+
+
+# Кэш enum групп параметров (BuiltInParameterGroup или GroupTypeId для 2024+)
+_PARAM_GROUP_ENUM_CACHE = None
+
+
+def _get_param_group_enum():
+    """Получить enum групп параметров (проба импорта выполняется один раз)."""
+    global _PARAM_GROUP_ENUM_CACHE
+    if _PARAM_GROUP_ENUM_CACHE is None:
+        try:
+            from Autodesk.Revit.DB import BuiltInParameterGroup as group_enum
+        except ImportError:
+            # Revit 2024+ использует GroupTypeId
+            from Autodesk.Revit.DB import GroupTypeId as group_enum
+        _PARAM_GROUP_ENUM_CACHE = group_enum
+    return _PARAM_GROUP_ENUM_CACHE
+
+
+def _get_forge_type_id_legacy(g):
+    """Получить строковый ID из ForgeTypeId объекта (с запасными вариантами)."""
     try:
         # Revit 2024+ ForgeTypeId имеет свойство TypeId
         return g.TypeId
@@ -137,6 +238,20 @@ def get_forge_type_id(g):
             return str(id(g))
 
 
+def _get_forge_type_id_fast(g):
+    """Получить строковый ID из ForgeTypeId объекта (Revit 2024+)."""
+    return g.TypeId
+
+
+# Версия Revit известна заранее - выбираем реализацию один раз,
+# без try/except на каждую группу
+REVIT_MAJOR = int(app.VersionNumber)
+if REVIT_MAJOR >= 2024:
+    get_forge_type_id = _get_forge_type_id_fast
+else:
+    get_forge_type_id = _get_forge_type_id_legacy
+
+
 def fix_label(label):
     """Исправить label если есть известное несоответствие API/UI."""
     return LABEL_FIXES.get(label, label)
@@ -152,6 +267,10 @@ def get_all_parameter_groups():
     groups = []
     seen_ids = set()  # Для избежания дубликатов
 
+    # Подписи из прошлых запусков - без вызова LabelUtils на каждую группу
+    labels = _load_group_labels()
+    cached_count = len(labels)
+
     # Пробуем Revit 2024+ API
     try:
         from Autodesk.Revit.DB import ParameterUtils, LabelUtils
@@ -164,12 +283,15 @@ def get_all_parameter_groups():
                 continue
             seen_ids.add(gid)
 
-            # Получение label
-            try:
-                label = LabelUtils.GetLabelForGroup(g)
-            except Exception:
-                # Label не доступен - будет сгенерирован ниже
-                label = ""
+            # Получение label (из кэша или через Revit API)
+            label = labels.get(gid)
+            if label is None:
+                try:
+                    label = LabelUtils.GetLabelForGroup(g)
+                except Exception:
+                    # Label не доступен - будет сгенерирован ниже
+                    label = ""
+                labels[gid] = label
 
             # Если label пустой - генерируем читаемое имя из ID
             if not label:
@@ -184,6 +306,8 @@ def get_all_parameter_groups():
             groups.append((label, g))
 
         if groups:
+            if len(labels) != cached_count:
+                _save_group_labels(labels)
             # Сортировать по имени (регистронезависимо)
             groups.sort(key=lambda x: x[0].lower() if x[0] else "")
             return groups
@@ -218,11 +342,14 @@ def get_all_parameter_groups():
 
                 seen_ids.add(gid)
 
-                try:
-                    label = LU.GetLabelFor(g)
-                except Exception:
-                    # Label не доступен для этой группы
-                    label = ""
+                label = labels.get(gid)
+                if label is None:
+                    try:
+                        label = LU.GetLabelFor(g)
+                    except Exception:
+                        # Label не доступен для этой группы
+                        label = ""
+                    labels[gid] = label
 
                 # Если label пустой - используем имя enum
                 if not label:
@@ -231,6 +358,8 @@ def get_all_parameter_groups():
                 groups.append((label, g))
 
             if groups:
+                if len(labels) != cached_count:
+                    _save_group_labels(labels)
                 # Сортировать по имени
                 groups.sort(key=lambda x: x[0])
                 return groups
@@ -238,8 +367,8 @@ def get_all_parameter_groups():
         # Старый API тоже не доступен - используем fallback
         groups = []  # Сбрасываем для fallback
 
-    # Fallback - базовый список (используем глобальный импорт)
-    # BuiltInParameterGroup уже импортирован в начале файла (или GroupTypeId для 2024+)
+    # Fallback - базовый список (BuiltInParameterGroup или GroupTypeId для 2024+)
+    BuiltInParameterGroup = _get_param_group_enum()
     fallback = []
     # Пробуем добавить базовые группы (могут отсутствовать в разных версиях Revit)
     pg_data = getattr(BuiltInParameterGroup, 'PG_DATA', None)
@@ -274,7 +403,8 @@ def get_parameter_groups():
 
 def parse_ids_simple(ids_path):
     """
-    Простой парсер IDS без внешних зависимостей.
+    Парсер IDS за один проход по XML (lxml iterparse или .NET XmlReader).
+    Регулярные выражения - запасной вариант для файлов с ошибками разметки.
     Возвращает dict: param_name -> {
         ifc_classes: [...],
         property_set: str,
@@ -287,126 +417,374 @@ def parse_ids_simple(ids_path):
     result = {}
 
     try:
-        with codecs.open(ids_path, 'r', 'utf-8') as f:
-            content = f.read()
-    except (IOError, UnicodeDecodeError):
-        # Попробовать другие кодировки
-        try:
-            with codecs.open(ids_path, 'r', 'utf-8-sig') as f:
-                content = f.read()
-        except (IOError, UnicodeDecodeError):
-            # Не удалось прочитать файл ни в одной кодировке
-            return result
+        if _HAS_LXML:
+            return _parse_ids_lxml(ids_path)
+        return _parse_ids_sysxml(ids_path)
+    except Exception:
+        # Невалидный XML - регулярки терпимее к ошибкам разметки
+        result = {}
 
-    # Найти все specification блоки
-    import re
+    merge_sets = {}
+    try:
+        for spec in _iter_ids_specs(ids_path):
+            _add_ids_spec_regex(result, merge_sets, spec)
+    except Exception:
+        # Файл недоступен или не в UTF-8
+        return {}
 
-    # Паттерн для specification с applicability и requirements
-    spec_pattern = r'<specification[^>]*>(.*?)</specification>'
-    specs = re.findall(spec_pattern, content, re.DOTALL)
+    return result
 
-    for spec in specs:
-        # Найти IFC классы в applicability
-        ifc_classes = []
 
-        # simpleValue
-        simple_matches = re.findall(r'<simpleValue>(IFC\w+)</simpleValue>', spec)
-        ifc_classes.extend(simple_matches)
+def _iter_ids_specs(ids_path):
+    """
+    Тела specification блоков по мере чтения файла.
+    В памяти только текст от конца прошлого блока до текущей строки,
+    а не весь файл.
+    """
+    parts = []
+    for line in iter_text_lines(ids_path, IDS_ENCODING):
+        parts.append(line)
+        if "</specification>" not in line:
+            continue
+        text = "\n".join(parts)
+        last = 0
+        for match in _RE_SPEC.finditer(text):
+            yield match.group(1)
+            last = match.end()
+        parts = [text[last:]]
+
+
+def _add_ids_spec_regex(result, merge_sets, spec):
+    """Разобрать тело specification регулярками и добавить параметры в результат."""
+    # Найти IFC классы в applicability
+    ifc_classes = []
+
+    # simpleValue
+    simple_matches = _RE_IFC_SIMPLE.findall(spec)
+    ifc_classes.extend(simple_matches)
+
+    # enumeration value: IFC классы отбираем из общего прохода по значениям
+    ifc_match = _RE_IFC_CLASS.match
+    ifc_classes.extend(v for v in _RE_ENUM.findall(spec) if ifc_match(v))
+
+    # Убрать дубликаты (классы в верхнем регистре - как ключи маппинга)
+    ifc_classes = _unique_ifc_classes(ifc_classes)
+
+    # Найти все property в requirements (включая атрибуты)
+    properties = _RE_PROP.findall(spec)
+
+    for prop_match in properties:
+        prop_attrs = prop_match[0]  # атрибуты тега <property>
+        prop_body = prop_match[1]   # содержимое тега
+
+        # instructions из атрибута property
+        instr_match = _RE_INSTR.search(prop_attrs)
+        # Декодируем XML/HTML entities (&#xA;, &quot;, &amp;, &lt; ...) за один проход
+        instructions_attr = WebUtility.HtmlDecode(instr_match.group(1)) if instr_match else ""
+
+        # dataType из атрибута property
+        dtype_match = _RE_DTYPE.search(prop_attrs)
+        data_type = dtype_match.group(1) if dtype_match else ""
+
+        # PropertySet
+        pset_match = _RE_PSET.search(prop_body)
+        property_set = pset_match.group(1) if pset_match else ""
+
+        # Имя параметра
+        name_match = _RE_BASENAME.search(prop_body)
+        if not name_match:
+            continue
+        param_name = name_match.group(1).strip()
+
+        # Допустимые значения из enumeration (НЕ IFC классы)
+        allowed_values = []
+        value_block = _RE_VALUE.search(prop_body)
+        if value_block:
+            # Ищем xs:enumeration value, исключая IFC классы
+            enum_values = _RE_ENUM.findall(value_block.group(1))
+            for val in enum_values:
+                # Исключаем IFC классы (начинаются с IFC)
+                if not val.upper().startswith("IFC"):
+                    allowed_values.append(val)
+
+        _add_ids_param(result, merge_sets, param_name, ifc_classes, property_set,
+                       allowed_values, instructions_attr, data_type)
+
+
+# Теги IDS для lxml (с пространством имён)
+_IDS_SPEC_TAG = "{" + IDS_NS + "}specification"
+_IDS_PROPERTY_TAG = "{" + IDS_NS + "}property"
+_IDS_SIMPLE_VALUE_TAG = "{" + IDS_NS + "}simpleValue"
+_IDS_VALUE_TAG = "{" + IDS_NS + "}value"
+_IDS_PSET_VALUE_PATH = "{0}propertySet/{0}simpleValue".format("{" + IDS_NS + "}")
+_IDS_NAME_VALUE_PATH = "{0}baseName/{0}simpleValue".format("{" + IDS_NS + "}")
+_XS_ENUM_TAG = "{" + XS_NS + "}enumeration"
+
+
+def _parse_ids_lxml(ids_path):
+    """Потоковый разбор IDS через lxml iterparse (по одной спецификации)."""
+    result = {}
+    merge_sets = {}
+
+    for _event, spec in _etree.iterparse(ids_path, events=("end",), tag=_IDS_SPEC_TAG):
+        # IFC классы: simpleValue и xs:enumeration вида IFCxxx
+        ifc_classes = []
+        for node in spec.iter(_IDS_SIMPLE_VALUE_TAG):
+            if node.text and _RE_IFC_CLASS.match(node.text):
+                ifc_classes.append(node.text)
+        for node in spec.iter(_XS_ENUM_TAG):
+            value = node.get("value")
+            if value and _RE_IFC_CLASS.match(value):
+                ifc_classes.append(value)
+        ifc_classes = _unique_ifc_classes(ifc_classes)
+
+        for prop in spec.iter(_IDS_PROPERTY_TAG):
+            name_node = prop.find(_IDS_NAME_VALUE_PATH)
+            if name_node is None or not name_node.text:
+                continue
 
-        # enumeration value для IFC классов
-        enum_matches = re.findall(r'<xs:enumeration value="(IFC\w+)"', spec)
-        ifc_classes.extend(enum_matches)
+            pset_node = prop.find(_IDS_PSET_VALUE_PATH)
+            property_set = pset_node.text if pset_node is not None and pset_node.text else ""
 
-        # Убрать дубликаты
-        ifc_classes = list(set(ifc_classes))
+            # Допустимые значения из enumeration (НЕ IFC классы)
+            allowed_values = []
+            value_node = prop.find(_IDS_VALUE_TAG)
+            if value_node is not None:
+                for node in value_node.iter(_XS_ENUM_TAG):
+                    val = node.get("value")
+                    if val and not val.upper().startswith("IFC"):
+                        allowed_values.append(val)
 
-        # Найти все property в requirements (включая атрибуты)
-        property_pattern = r'<property([^>]*)>(.*?)</property>'
-        properties = re.findall(property_pattern, spec, re.DOTALL)
+            _add_ids_param(result, merge_sets, name_node.text.strip(), ifc_classes, property_set,
+                           allowed_values, prop.get("instructions") or "",
+                           prop.get("dataType") or "")
 
-        for prop_match in properties:
-            prop_attrs = prop_match[0]  # атрибуты тега <property>
-            prop_body = prop_match[1]   # содержимое тега
+        # Освобождаем разобранные узлы - память не растёт с размером файла
+        spec.clear()
+        while spec.getprevious() is not None:
+            del spec.getparent()[0]
 
-            # instructions из атрибута property
-            instr_match = re.search(r'instructions="([^"]*)"', prop_attrs)
-            instructions_attr = instr_match.group(1) if instr_match else ""
-            # Декодируем HTML entities
-            instructions_attr = instructions_attr.replace("&#xA;", "\n").replace("&quot;", '"')
+    return result
 
-            # dataType из атрибута property
-            dtype_match = re.search(r'dataType="([^"]+)"', prop_attrs)
-            data_type = dtype_match.group(1) if dtype_match else ""
 
-            # PropertySet
-            pset_match = re.search(r'<propertySet>.*?<simpleValue>([^<]+)</simpleValue>', prop_body, re.DOTALL)
-            property_set = pset_match.group(1) if pset_match else ""
+def _parse_ids_sysxml(ids_path):
+    """Потоковый разбор IDS через .NET XmlReader (один проход без загрузки файла)."""
+    clr.AddReference('System.Xml')
+    from System.Xml import XmlReader, XmlReaderSettings, XmlNodeType, DtdProcessing
 
-            # Имя параметра
-            name_match = re.search(r'<baseName>.*?<simpleValue>([^<]+)</simpleValue>', prop_body, re.DOTALL)
-            if not name_match:
+    result = {}
+    merge_sets = {}
+
+    settings = XmlReaderSettings()
+    settings.IgnoreComments = True
+    settings.IgnoreProcessingInstructions = True
+    settings.IgnoreWhitespace = True
+    settings.DtdProcessing = DtdProcessing.Ignore
+    settings.CloseInput = True
+
+    path = []          # Стек локальных имён открытых элементов
+    ifc_classes = []   # IFC классы текущей спецификации (в порядке появления)
+    props = []         # Требования текущей спецификации
+    prop = None        # Текущий property: dict
+    prop_depth = 0     # Глубина дочерних элементов property в path
+    text = []          # Текст текущего simpleValue
+
+    reader = XmlReader.Create(open_read_stream(ids_path), settings)
+    try:
+        while reader.Read():
+            node_type = reader.NodeType
+            if node_type == XmlNodeType.Text or node_type == XmlNodeType.CDATA:
+                text.append(reader.Value)
+                continue
+            if node_type == XmlNodeType.Element:
+                name = reader.LocalName
+                path.append(name)
+                if name == "specification":
+                    ifc_classes = []
+                    props = []
+                elif name == "property":
+                    prop = {
+                        'pset': None, 'name': None, 'values': [],
+                        'instructions': reader.GetAttribute("instructions") or "",
+                        'data_type': reader.GetAttribute("dataType") or "",
+                    }
+                    prop_depth = len(path)
+                elif name == "simpleValue":
+                    text = []
+                elif name == "enumeration" and reader.NamespaceURI == XS_NS:
+                    value = reader.GetAttribute("value")
+                    if value:
+                        if _RE_IFC_CLASS.match(value):
+                            ifc_classes.append(value)
+                        elif (prop is not None and len(path) > prop_depth
+                              and path[prop_depth] == "value"
+                              and not value.upper().startswith("IFC")):
+                            prop['values'].append(value)
+                if not reader.IsEmptyElement:
+                    continue
+            elif node_type != XmlNodeType.EndElement:
                 continue
-            param_name = name_match.group(1).strip()
 
-            # Допустимые значения из enumeration (НЕ IFC классы)
-            allowed_values = []
-            value_block = re.search(r'<value>(.*?)</value>', prop_body, re.DOTALL)
-            if value_block:
-                # Ищем xs:enumeration value, исключая IFC классы
-                enum_values = re.findall(r'<xs:enumeration value="([^"]+)"', value_block.group(1))
-                for val in enum_values:
-                    # Исключаем IFC классы (начинаются с IFC)
-                    if not val.upper().startswith("IFC"):
-                        allowed_values.append(val)
+            # Закрытие элемента (EndElement или пустой элемент)
+            name = path.pop()
+            if name == "simpleValue":
+                value = "".join(text)
+                if _RE_IFC_CLASS.match(value):
+                    ifc_classes.append(value)
+                if prop is not None and len(path) == prop_depth + 1:
+                    owner = path[prop_depth]
+                    if owner == "propertySet" and prop['pset'] is None:
+                        prop['pset'] = value
+                    elif owner == "baseName" and prop['name'] is None:
+                        prop['name'] = value
+            elif name == "property" and prop is not None:
+                props.append(prop)
+                prop = None
+            elif name == "specification":
+                spec_classes = _unique_ifc_classes(ifc_classes)
+                for p in props:
+                    if p['name']:
+                        _add_ids_param(result, merge_sets, p['name'].strip(), spec_classes,
+                                       p['pset'] or "", p['values'],
+                                       p['instructions'], p['data_type'])
+                props = []
+    finally:
+        reader.Close()
+
+    return result
+
+
+def _unique_ifc_classes(ifc_classes):
+    """IFC классы в верхнем регистре без дублей, в порядке появления в IDS."""
+    seen = set()
+    unique = []
+    for ifc in ifc_classes:
+        ifc = ifc.upper()
+        if ifc not in seen:
+            seen.add(ifc)
+            unique.append(ifc)
+    return unique
 
-            # Определить Instance/Type
-            is_type = False
-            for type_pset in TYPE_PROPERTY_SETS:
-                if type_pset.lower() in property_set.lower():
-                    is_type = True
-                    break
-
-            # Сохранить
-            if param_name not in result:
-                result[param_name] = {
-                    'ifc_classes': ifc_classes,
-                    'property_set': property_set,
-                    'is_type': is_type,
-                    'allowed_values': allowed_values,
-                    'instructions': instructions_attr,
-                    'data_type': data_type
-                }
+
+def _add_ids_param(result, merge_sets, param_name, ifc_classes, property_set,
+                   allowed_values, instructions, data_type):
+    """
+    Добавить параметр IDS в результат или дополнить уже найденный.
+    merge_sets: param_name -> (множество IFC классов, множество значений) -
+    проверка дублей при слиянии за O(1) вместо поиска по списку.
+    """
+    # Определить Instance/Type
+    pset_lower = property_set.lower()
+    is_type = any(t in pset_lower for t in _TYPE_PSETS_LOWER)
+
+    # Сохранить
+    if param_name not in result:
+        # Копия списка классов - он общий для всех property спецификации
+        result[param_name] = {
+            'ifc_classes': list(ifc_classes),
+            'property_set': property_set,
+            'is_type': is_type,
+            'allowed_values': allowed_values,
+            'instructions': instructions,
+            'data_type': data_type
+        }
+        merge_sets[param_name] = (set(ifc_classes), set(allowed_values))
+    else:
+        entry = result[param_name]
+        ifc_set, values_set = merge_sets[param_name]
+        # Добавить IFC классы
+        for ifc in ifc_classes:
+            if ifc not in ifc_set:
+                ifc_set.add(ifc)
+                entry['ifc_classes'].append(ifc)
+        # Добавить допустимые значения
+        for val in allowed_values:
+            if val not in values_set:
+                values_set.add(val)
+                entry['allowed_values'].append(val)
+
+
+def load_ids_data(ids_path):
+    """Данные IDS из кэша, если файл не изменился, иначе парсинг."""
+    ids_data = load_cached(ids_path, IDS_CACHE_KIND)
+    if ids_data is None:
+        ids_data = parse_ids_simple(ids_path)
+        # Пустой результат (ошибка чтения) не кэшируем
+        if ids_data:
+            save_cached(ids_path, IDS_CACHE_KIND, ids_data)
+    return ids_data
+
+
+# Категории документа по id BuiltInCategory: (Category или None, причина отказа).
+# Заполняется по мере надобности и живёт, пока открыто окно (doc не меняется)
+_CATEGORY_CACHE = {}
+
+
+def resolve_category(cat_id):
+    """Найти категорию Revit для привязки параметра (результат кэшируется)."""
+    cached = _CATEGORY_CACHE.get(cat_id)
+    if cached is None:
+        try:
+            cat = Category.GetCategory(doc, BuiltInCategory(cat_id))
+            if not cat:
+                cached = (None, "НЕ НАЙДЕНА")
+            elif not cat.AllowsBoundParameters:
+                cached = (None, "НЕ ДОПУСКАЕТ привязку")
             else:
-                # Добавить IFC классы
-                for ifc in ifc_classes:
-                    if ifc not in result[param_name]['ifc_classes']:
-                        result[param_name]['ifc_classes'].append(ifc)
-                # Добавить допустимые значения
-                for val in allowed_values:
-                    if val not in result[param_name].get('allowed_values', []):
-                        if 'allowed_values' not in result[param_name]:
-                            result[param_name]['allowed_values'] = []
-                        result[param_name]['allowed_values'].append(val)
+                cached = (cat, None)
+        except Exception as e:
+            # Ошибка категории - запоминаем причину
+            cached = (None, "ОШИБКА: {}".format(str(e)))
+        _CATEGORY_CACHE[cat_id] = cached
+    return cached
 
-    return result
+
+def create_category_set_for_param(param_categories):
+    """
+    Создать CategorySet из списка категорий [(name, id), ...].
+    Категории берутся из _CATEGORY_CACHE - Revit API вызывается
+    один раз на категорию, а не на каждый параметр.
+    Возвращает (cat_set, failed, inserted) - inserted считается здесь,
+    чтобы не читать cat_set.IsEmpty через Revit API.
+    """
+    cat_set = CategorySet()
+    failed = []
+    inserted = 0
+    for cat_name, cat_id in param_categories:
+        cat, reason = resolve_category(cat_id)
+        if cat is None:
+            failed.append(cat_name)
+            if Logger.is_debug_enabled():
+                Logger.debug(SCRIPT_NAME, "    {} {}".format(cat_name, reason))
+        else:
+            cat_set.Insert(cat)
+            inserted += 1
+    return cat_set, failed, inserted
 
 
 def get_revit_categories_for_param(ids_info):
     """Получить категории Revit для параметра на основе IFC классов."""
     categories = []
-    seen = set()
+    seen = set()  # Кортежи (имя, id) из маппинга - одна категория на имя
 
-    for ifc_class in ids_info.get('ifc_classes', []):
-        ifc_upper = ifc_class.upper()
-        if ifc_upper in IFC_TO_REVIT_CATEGORIES:
-            for cat_tuple in IFC_TO_REVIT_CATEGORIES[ifc_upper]:
-                if cat_tuple[0] not in seen:
-                    categories.append(cat_tuple)
-                    seen.add(cat_tuple[0])
+    # Классы без дублей (убраны при разборе IDS) и уже в верхнем регистре -
+    # один поиск в словаре на класс
+    mapping_get = IFC_TO_REVIT_CATEGORIES.get
+    for ifc_class in ids_info.get('ifc_classes', ()):
+        for cat_tuple in mapping_get(ifc_class, ()):
+            if cat_tuple not in seen:
+                seen.add(cat_tuple)
+                categories.append(cat_tuple)
 
     return categories
 
 
+def get_sorted_category_names(ids_data):
+    """Отсортированные имена категорий для каждого параметра IDS: name -> [...]."""
+    return dict((name, sorted(c[0] for c in get_revit_categories_for_param(info)))
+                for name, info in ids_data.items())
+
+
 # === ПАРСЕР ФОП ===
 
 class FOPParser:
@@ -415,18 +793,22 @@ class FOPParser:
     def __init__(self, fop_path):
         self.fop_path = fop_path
         self.groups = {}  # id -> name
-        self.parameters = []  # list of param dicts
+        # Параметры - параллельные списки (i-й параметр = i-е элементы списков)
+        self.names = []
+        self.guids = []
+        self.datatypes = []
+        self.group_ids = []
+        self.group_names = []
+        self.descriptions = []
 
     def parse(self):
         """Парсить ФОП файл."""
-        # Читаем файл в UTF-16
-        with codecs.open(self.fop_path, 'r', 'utf-16') as f:
-            lines = f.readlines()
-
         current_section = None
 
-        for line in lines:
-            line = line.strip()
+        # Читаем файл в UTF-16 построчно (BOM определяет порядок байт),
+        # без загрузки всех строк в память
+        for raw in iter_text_lines(self.fop_path, Encoding.Unicode):
+            line = raw.strip()
             if not line or line.startswith('#'):
                 continue
 
@@ -446,21 +828,55 @@ class FOPParser:
             elif current_section == 'PARAM' and len(parts) >= 6:
                 # PARAM    GUID    NAME    DATATYPE    DATACATEGORY    GROUP    VISIBLE    DESCRIPTION...
                 if parts[0] == 'PARAM':
-                    param = {
-                        'guid': parts[1],
-                        'name': parts[2],
-                        'datatype': parts[3],
-                        'group_id': parts[5],
-                        'group_name': self.groups.get(parts[5], ""),
-                        'description': parts[7] if len(parts) > 7 else ""
-                    }
-                    self.parameters.append(param)
+                    self.guids.append(parts[1])
+                    self.names.append(parts[2])
+                    self.datatypes.append(parts[3])
+                    self.group_ids.append(parts[5])
+                    self.group_names.append(self.groups.get(parts[5], ""))
+                    self.descriptions.append(parts[7] if len(parts) > 7 else "")
 
         return self
 
 
+class WarningsPreprocessor(IFailuresPreprocessor):
+    """Удалять предупреждения транзакции без модальных диалогов Revit."""
+
+    def PreprocessFailures(self, failures_accessor):
+        """Снять предупреждения; ошибки остаются на обработку Revit."""
+        for failure in failures_accessor.GetFailureMessages():
+            if failure.GetSeverity() == FailureSeverity.Warning:
+                failures_accessor.DeleteWarning(failure)
+        return FailureProcessingResult.Continue
+
+
 # === ГЛАВНОЕ ОКНО ===
 
+# WinForms грузим только перед окном - разбору IDS/ФОП они не нужны
+clr.AddReference('System.Windows.Forms')
+clr.AddReference('System.Drawing')
+
+from System.Windows.Forms import (
+    Form, Label, Button, CheckBox, ComboBox, ListBox,
+    ListView, ListViewItem, View, ColumnHeaderStyle,
+    FormStartPosition, FormBorderStyle,
+    DialogResult, OpenFileDialog,
+    SelectionMode, GroupBox
+)
+from System.Drawing import Point, Size, Color
+from System.ComponentModel import BackgroundWorker
+
+
+def fill_list_box(list_box, values):
+    """Заменить строки ListBox/ComboBox одним AddRange (одна перерисовка вместо N)."""
+    list_box.BeginUpdate()
+    try:
+        list_box.Items.Clear()
+        if values:
+            list_box.Items.AddRange(System.Array[System.Object](values))
+    finally:
+        list_box.EndUpdate()
+
+
 class FOPtoProjectForm(Form):
     """Диалог добавления параметров из ФОП в проект."""
 
@@ -469,7 +885,18 @@ class FOPtoProjectForm(Form):
         self.ids_path = None
         self.parser = None
         self.ids_data = {}  # param_name -> ids_info
-        self.prefix = ""    # Префикс параметров
+        self._ids_name_set = frozenset()  # Имена параметров IDS (проверка вхождения)
+        self._ids_names_lower = {}  # Имя IDS в нижнем регистре -> имя IDS
+        self._cat_names = {}  # Имя в IDS -> отсортированные имена категорий
+        self._param_cats_cache = {}  # Имя в IDS -> [(имя категории, id), ...]
+        self._normalized_fop = []  # (имя в ФОП, имя в IDS) - строится в load_fop
+        self._ids_worker = None  # Фоновый парсинг IDS (последний запущенный)
+        self._param_items = []   # Строки списка параметров (виртуальный ListView)
+        self._last_param_idx = -1  # Параметр, для которого уже показаны категории
+        self._prefix = ""          # Префикс параметров (из txt_prefix)
+        self._prefix_sep = ""      # Префикс с разделителем "_"
+        self._prefix_sep_len = 0
+        self._ids_name_cache = {}  # fop_name -> имя в IDS (для текущего префикса)
         self.selected_params = []
         self.selected_categories = []
         self.setup_form()
@@ -483,6 +910,8 @@ class FOPtoProjectForm(Form):
         self.FormBorderStyle = FormBorderStyle.FixedDialog
         self.MaximizeBox = False
         self.MinimizeBox = False
+        # Группы параметров грузятся после показа окна (см. on_form_shown)
+        self.Shown += self.on_form_shown
 
         y = 15
 
@@ -569,9 +998,19 @@ class FOPtoProjectForm(Form):
         grp_params.Location = Point(15, y)
         grp_params.Size = Size(300, 280)
 
-        self.lst_params = ListBox()
+        # Виртуальный список: строки отдаются по запросу, рисуются только видимые
+        self.lst_params = ListView()
         self.lst_params.Location = Point(10, 20)
         self.lst_params.Size = Size(280, 250)
+        self.lst_params.View = View.Details
+        self.lst_params.HeaderStyle = getattr(ColumnHeaderStyle, "None")
+        self.lst_params.Columns.Add("", 255)
+        self.lst_params.FullRowSelect = True
+        self.lst_params.MultiSelect = False
+        self.lst_params.HideSelection = False
+        self.lst_params.VirtualMode = True
+        self.lst_params.VirtualListSize = 0
+        self.lst_params.RetrieveVirtualItem += self.on_retrieve_param_item
         self.lst_params.SelectedIndexChanged += self.on_param_selected
         grp_params.Controls.Add(self.lst_params)
 
@@ -639,19 +1078,8 @@ class FOPtoProjectForm(Form):
         self.cmb_group.DropDownStyle = System.Windows.Forms.ComboBoxStyle.DropDownList
         self.cmb_group.MaxDropDownItems = 25
 
-        # Динамически получить все группы параметров из Revit
-        self.param_groups = get_parameter_groups()
-        for group_name, _ in self.param_groups:
-            self.cmb_group.Items.Add(group_name)
-
-        # Выбрать "Данные" по умолчанию
-        for i, (name, _) in enumerate(self.param_groups):
-            if "Данные" in name or "Data" in name:
-                self.cmb_group.SelectedIndex = i
-                break
-        else:
-            self.cmb_group.SelectedIndex = 0
-
+        # Заполняется в load_param_groups после показа окна
+        self.param_groups = []
         self.Controls.Add(self.cmb_group)
 
         self.chk_instance = CheckBox()
@@ -688,6 +1116,27 @@ class FOPtoProjectForm(Form):
         btn_close.Click += self.on_close
         self.Controls.Add(btn_close)
 
+    def on_form_shown(self, sender, args):
+        """Окно уже отрисовано - загрузить группы параметров."""
+        self.load_param_groups()
+
+    def load_param_groups(self):
+        """
+        Динамически получить все группы параметров из Revit.
+        Revit API доступен только из потока Revit, поэтому не в фоне, а сразу
+        после показа окна: форма появляется без ожидания перебора групп.
+        """
+        self.param_groups = get_parameter_groups()
+        fill_list_box(self.cmb_group, [name for name, _ in self.param_groups])
+
+        # Выбрать "Данные" по умолчанию
+        for i, (name, _) in enumerate(self.param_groups):
+            if "Данные" in name or "Data" in name:
+                self.cmb_group.SelectedIndex = i
+                break
+        else:
+            self.cmb_group.SelectedIndex = 0
+
     def on_browse_ids(self, sender, args):
         """Выбор IDS файла."""
         dialog = OpenFileDialog()
@@ -699,25 +1148,58 @@ class FOPtoProjectForm(Form):
             self.load_ids()
 
     def load_ids(self):
-        """Загрузить и парсить IDS файл."""
+        """Загрузить и парсить IDS файл (парсинг в фоне, окно не блокируется)."""
         Logger.log_separator(SCRIPT_NAME, "Загрузка IDS файла")
         Logger.file_opened(SCRIPT_NAME, self.ids_path, "IDS файл")
 
-        try:
-            self.ids_data = parse_ids_simple(self.ids_path)
-            count = len(self.ids_data)
+        self.ids_data = {}
+        self.set_ids_names()
+        self._cat_names = {}
+        self.update_add_button_state()
+        self.lbl_status.Text = "Загрузка IDS..."
+        self.lbl_status.ForeColor = Color.Black
+
+        # Пока IDS парсится, можно выбрать ФОП; результат придёт в on_ids_loaded
+        worker = BackgroundWorker()
+        worker.DoWork += self.on_ids_do_work
+        worker.RunWorkerCompleted += self.on_ids_loaded
+        self._ids_worker = worker
+        worker.RunWorkerAsync(self.ids_path)
+
+    def on_ids_do_work(self, sender, args):
+        """Парсинг IDS в фоновом потоке (без обращения к элементам окна)."""
+        ids_data = load_ids_data(args.Argument)
+        # Категории для списка сортируем здесь, а не при каждом выборе параметра
+        args.Result = (ids_data, get_sorted_category_names(ids_data))
+
+    def on_ids_loaded(self, sender, args):
+        """Результат фонового парсинга IDS (вызывается в потоке окна)."""
+        # Окно закрыто или уже выбран другой IDS - результат не нужен
+        if self.IsDisposed or sender is not self._ids_worker:
+            return
+        self._ids_worker = None
 
-            Logger.info(SCRIPT_NAME, "IDS успешно загружен: {} параметров".format(count))
+        if args.Error is not None:
+            Logger.error(SCRIPT_NAME, "Ошибка загрузки IDS: {}".format(args.Error.Message))
+            self.lbl_status.Text = "Ошибка IDS: {}".format(args.Error.Message)
+            self.lbl_status.ForeColor = Color.Red
+            return
+
+        self.ids_data, self._cat_names = args.Result
+        self.set_ids_names()
+        count = len(self.ids_data)
+
+        Logger.info(SCRIPT_NAME, "IDS успешно загружен: {} параметров".format(count))
+        if Logger.is_debug_enabled():
             Logger.data(SCRIPT_NAME, "Параметры IDS", list(self.ids_data.keys()))
 
-            self.lbl_status.Text = "IDS: {} параметров найдено".format(count)
-            self.lbl_status.ForeColor = Color.DarkGreen
-            self.update_add_button_state()
+        self.lbl_status.Text = "IDS: {} параметров найдено".format(count)
+        self.lbl_status.ForeColor = Color.DarkGreen
 
-        except Exception as e:
-            Logger.error(SCRIPT_NAME, "Ошибка загрузки IDS: {}".format(str(e)), exc_info=True)
-            self.lbl_status.Text = "Ошибка IDS: {}".format(str(e))
-            self.lbl_status.ForeColor = Color.Red
+        # ФОП мог загрузиться раньше IDS - обновить пометки [IDS]
+        if self.parser:
+            self.load_fop()
+        self.update_add_button_state()
 
     def update_add_button_state(self):
         """Обновить состояние кнопки 'Добавить' в зависимости от загруженных файлов."""
@@ -734,28 +1216,56 @@ class FOPtoProjectForm(Form):
             self.txt_fop.Text = self.fop_path
             self.load_fop()
 
+    def set_ids_names(self):
+        """Индексы имён IDS: точное совпадение и без учёта регистра (один раз на загрузку)."""
+        self._ids_name_set = frozenset(self.ids_data)
+        self._ids_names_lower = dict((name.lower(), name) for name in self.ids_data)
+        # Имена в кэше get_ids_name и категории сопоставлены с прежним IDS
+        self._ids_name_cache = {}
+        self._param_cats_cache = {}
+
     def get_ids_name(self, fop_name):
         """
         Получить имя параметра для поиска в IDS (без префикса).
         ФОП: 'ЦГЭ_Класс прочности' -> IDS: 'Класс прочности'
         Также убираем лишние пробелы в начале/конце.
+        Если точного совпадения в IDS нет - ищем без учёта регистра.
         """
-        prefix = self.txt_prefix.Text.strip()
+        cached = self._ids_name_cache.get(fop_name)
+        if cached is not None:
+            return cached
+
         # Убираем лишние пробелы из имени параметра
         name = fop_name.strip()
-        if prefix and name.startswith(prefix + "_"):
-            return name[len(prefix) + 1:].strip()
-        return name.strip()
+        if self._prefix_sep_len and name.startswith(self._prefix_sep):
+            name = name[self._prefix_sep_len:].strip()
+        if name not in self._ids_name_set:
+            name = self._ids_names_lower.get(name.lower(), name)
+        self._ids_name_cache[fop_name] = name
+        return name
+
+    def update_prefix(self):
+        """Запомнить префикс из поля ввода (чтобы не читать TextBox на каждое имя)."""
+        prefix = self.txt_prefix.Text.strip()
+        if prefix == self._prefix:
+            return
+        # Имена в кэше посчитаны для прежнего префикса
+        self._ids_name_cache = {}
+        self._prefix = prefix
+        self._prefix_sep = self._prefix + "_" if self._prefix else ""
+        self._prefix_sep_len = len(self._prefix_sep)
 
     def on_prefix_changed(self, sender, args):
         """При изменении префикса обновить статус."""
-        prefix = self.txt_prefix.Text.strip()
+        self.update_prefix()
+        prefix = self._prefix
         if prefix:
             self.lbl_status.Text = "Префикс: '{}'. Нажмите 'Обновить' для перезагрузки".format(prefix)
             self.lbl_status.ForeColor = Color.DarkBlue
 
     def on_reload_fop(self, sender, args):
         """Перезагрузить ФОП с учётом нового префикса."""
+        self.update_prefix()
         if self.fop_path:
             self.load_fop()
 
@@ -764,46 +1274,59 @@ class FOPtoProjectForm(Form):
         Logger.log_separator(SCRIPT_NAME, "Загрузка ФОП файла")
         Logger.file_opened(SCRIPT_NAME, self.fop_path, "ФОП файл")
 
-        prefix = self.txt_prefix.Text.strip()
+        prefix = self._prefix
         Logger.debug(SCRIPT_NAME, "Префикс для сопоставления: '{}'".format(prefix if prefix else "(нет)"))
 
+        self._normalized_fop = []
         try:
             self.parser = FOPParser(self.fop_path)
             self.parser.parse()
 
-            Logger.info(SCRIPT_NAME, "ФОП успешно распарсен: {} параметров".format(len(self.parser.parameters)))
+            # Имена для поиска в IDS считаем один раз на загрузку ФОП
+            self._normalized_fop = [(name, self.get_ids_name(name))
+                                    for name in self.parser.names]
+
+            Logger.info(SCRIPT_NAME, "ФОП успешно распарсен: {} параметров".format(len(self.parser.names)))
 
             # Заполнить список параметров
-            self.lst_params.Items.Clear()
+            self._last_param_idx = -1
+            self.lst_params.SelectedIndices.Clear()
+            items = []
             matched_count = 0
+            # Списки имён нужны только для Logger.data (уровень DEBUG)
+            log_data = Logger.is_debug_enabled()
             matched_params = []
             unmatched_params = []
 
-            for param in self.parser.parameters:
-                fop_name = param['name']
-                ids_name = self.get_ids_name(fop_name)
+            ids_names = self._ids_name_set
+            for fop_name, ids_name in self._normalized_fop:
 
                 # Пометить, если есть в IDS (с учётом префикса)
                 marker = ""
-                if ids_name in self.ids_data:
+                if ids_name in ids_names:
                     marker = " [IDS]"
                     matched_count += 1
-                    matched_params.append(fop_name)
-                else:
+                    if log_data:
+                        matched_params.append(fop_name)
+                elif log_data:
                     unmatched_params.append(fop_name)
 
                 display = "{}{}".format(fop_name, marker)
-                self.lst_params.Items.Add(display)
+                items.append(display)
+
+            self._param_items = items
+            self.lst_params.VirtualListSize = len(items)
+            self.lst_params.Invalidate()
 
             Logger.info(SCRIPT_NAME, "Сопоставление: {} совпадают с IDS, {} без совпадения".format(
-                matched_count, len(unmatched_params)))
+                matched_count, len(items) - matched_count))
 
             if matched_params:
                 Logger.data(SCRIPT_NAME, "Параметры с совпадением в IDS", matched_params)
             if unmatched_params:
                 Logger.data(SCRIPT_NAME, "Параметры БЕЗ совпадения в IDS", unmatched_params)
 
-            status = "ФОП: {} параметров".format(len(self.parser.parameters))
+            status = "ФОП: {} параметров".format(len(self.parser.names))
             if prefix:
                 status += " (префикс: {})".format(prefix)
             if self.ids_data:
@@ -818,30 +1341,35 @@ class FOPtoProjectForm(Form):
             self.lbl_status.Text = "Ошибка ФОП: {}".format(str(e))
             self.lbl_status.ForeColor = Color.Red
 
+    def on_retrieve_param_item(self, sender, args):
+        """Строка виртуального списка параметров по индексу."""
+        args.Item = ListViewItem(self._param_items[args.ItemIndex])
+
     def on_param_selected(self, sender, args):
         """При выборе параметра показать категории и допустимые значения из IDS."""
-        if self.lst_params.SelectedIndex < 0:
+        selected = self.lst_params.SelectedIndices
+        if selected.Count == 0:
             return
         if not self.parser:
             return
 
-        idx = self.lst_params.SelectedIndex
-        param = self.parser.parameters[idx]
-        fop_name = param['name']
-        ids_name = self.get_ids_name(fop_name)
+        idx = selected[0]
+        # Событие повторяется при перерисовке списка - тот же параметр уже показан
+        if idx == self._last_param_idx:
+            return
+        self._last_param_idx = idx
 
-        # Очистить список категорий
-        self.lst_cats.Items.Clear()
+        fop_name = self.parser.names[idx]
+        ids_name = self.get_ids_name(fop_name)
 
         if ids_name in self.ids_data:
             info = self.ids_data[ids_name]
 
-            # Категории - показать в списке категорий
-            cats = get_revit_categories_for_param(info)
-            for cat_name, _ in sorted(cats, key=lambda x: x[0]):
-                self.lst_cats.Items.Add(cat_name)
+            # Категории - показать в списке категорий (отсортированы при загрузке IDS)
+            sorted_names = self._cat_names.get(ids_name, [])
+            fill_list_box(self.lst_cats, sorted_names)
 
-            cat_names = [c[0] for c in cats] if cats else ["(не определено)"]
+            cat_names = sorted_names if sorted_names else ["(не определено)"]
 
             # Instance/Type
             param_type = "ПО ТИПУ" if info.get('is_type') else "ПО ЭКЗЕМПЛЯРУ"
@@ -877,16 +1405,14 @@ class FOPtoProjectForm(Form):
             # Обновить список допустимых значений (если есть)
             self.update_allowed_values(allowed, info.get('instructions', ''))
         else:
+            self.lst_cats.Items.Clear()
             self.lbl_recommendation.Text = "Параметр '{}' не найден в IDS".format(ids_name)
             self.update_allowed_values([], "")
 
     def update_allowed_values(self, values, instructions):
         """Обновить список допустимых значений."""
         if hasattr(self, 'lst_values'):
-            self.lst_values.Items.Clear()
-            if values:
-                for v in values:
-                    self.lst_values.Items.Add(v)
+            fill_list_box(self.lst_values, values)
             if hasattr(self, 'lbl_instructions'):
                 self.lbl_instructions.Text = instructions if instructions else ""
 
@@ -907,30 +1433,28 @@ class FOPtoProjectForm(Form):
 
         Logger.log_separator(SCRIPT_NAME, "Анализ несовпадений IDS и ФОП")
 
-        # Создаём множество нормализованных имён из ФОП
-        fop_names_normalized = set()
-        for p in self.parser.parameters:
-            fop_names_normalized.add(self.get_ids_name(p['name']))
+        # Множество нормализованных имён из ФОП (имена посчитаны в load_fop)
+        fop_names_normalized = set(ids_name for _, ids_name in self._normalized_fop)
 
-        # IDS параметры без соответствия в ФОП
-        ids_only = [name for name in self.ids_data.keys() if name not in fop_names_normalized]
+        # IDS параметры без соответствия в ФОП (разность множеств)
+        ids_only = sorted(self._ids_name_set - fop_names_normalized)
 
         # ФОП параметры без соответствия в IDS
-        fop_only = []
-        for p in self.parser.parameters:
-            ids_name = self.get_ids_name(p['name'])
-            if ids_name not in self.ids_data:
-                fop_only.append(p['name'])
-
-        if ids_only:
-            Logger.warning(SCRIPT_NAME, "Параметры IDS без соответствия в ФОП ({} шт):".format(len(ids_only)))
-            for name in ids_only:
-                Logger.warning(SCRIPT_NAME, "  - {}".format(name))
-
-        if fop_only:
-            Logger.warning(SCRIPT_NAME, "Параметры ФОП без соответствия в IDS ({} шт):".format(len(fop_only)))
-            for name in fop_only:
-                Logger.warning(SCRIPT_NAME, "  - {}".format(name))
+        ids_names = self._ids_name_set
+        fop_only = [fop_name for fop_name, ids_name in self._normalized_fop
+                    if ids_name not in ids_names]
+
+        # Списки имён выводим построчно, только если WARNING пишется в лог
+        log_warning = Logger.is_enabled_for("WARNING")
+
+        # Один вызов логгера на список вместо вызова на каждое имя
+        if ids_only and log_warning:
+            Logger.warning(SCRIPT_NAME, "Параметры IDS без соответствия в ФОП ({} шт):\n{}".format(
+                len(ids_only), "\n".join("  - " + name for name in ids_only)))
+
+        if fop_only and log_warning:
+            Logger.warning(SCRIPT_NAME, "Параметры ФОП без соответствия в IDS ({} шт):\n{}".format(
+                len(fop_only), "\n".join("  - " + name for name in fop_only)))
 
         if not ids_only and not fop_only:
             Logger.info(SCRIPT_NAME, "Все параметры IDS и ФОП совпадают")
@@ -961,15 +1485,13 @@ class FOPtoProjectForm(Form):
         self.log_mismatches()
 
         # Добавляем ВСЕ параметры из списка
-        if not self.parser.parameters:
+        if not self.parser.names:
             Logger.warning(SCRIPT_NAME, "Нет параметров для добавления")
             show_warning("Внимание", "Нет параметров в ФОП файле")
             return
 
-        all_indices = list(range(len(self.parser.parameters)))
-        all_names = [self.parser.parameters[i]['name'] for i in all_indices]
-        Logger.info(SCRIPT_NAME, "Будет добавлено {} параметров".format(len(all_indices)))
-        Logger.data(SCRIPT_NAME, "Параметры для добавления", all_names)
+        Logger.info(SCRIPT_NAME, "Будет добавлено {} параметров".format(len(self.parser.names)))
+        Logger.data(SCRIPT_NAME, "Параметры для добавления", self.parser.names)
 
         # Проверить наличие IDS данных (категории берутся для каждого параметра отдельно)
         if not self.ids_data:
@@ -996,31 +1518,6 @@ class FOPtoProjectForm(Form):
                        details=str(e))
             return
 
-        # Вспомогательная функция для создания CategorySet для конкретного параметра
-        def create_category_set_for_param(param_categories):
-            """Создать CategorySet из списка категорий [(name, id), ...]"""
-            cat_set = CategorySet()
-            failed = []
-            for cat_name, cat_id in param_categories:
-                try:
-                    bic = BuiltInCategory(cat_id)
-                    cat = Category.GetCategory(doc, bic)
-                    if cat:
-                        if cat.AllowsBoundParameters:
-                            cat_set.Insert(cat)
-                        else:
-                            failed.append(cat_name)
-                            Logger.debug(SCRIPT_NAME, "    {} НЕ ДОПУСКАЕТ привязку".format(cat_name))
-                    else:
-                        failed.append(cat_name)
-                        Logger.debug(SCRIPT_NAME, "    {} НЕ НАЙДЕНА".format(cat_name))
-                except Exception as e:
-                    # Ошибка категории - добавляем в failed и продолжаем
-                    failed.append(cat_name)
-                    Logger.debug(SCRIPT_NAME, "    {} ОШИБКА: {}".format(cat_name, str(e)))
-                    continue
-            return cat_set, failed
-
         Logger.info(SCRIPT_NAME, "Каждый параметр будет привязан к своим категориям из IDS")
 
         # Параметры
@@ -1031,88 +1528,154 @@ class FOPtoProjectForm(Form):
         Logger.info(SCRIPT_NAME, "Группа параметров: {}".format(self.cmb_group.SelectedItem))
 
         # Собрать имена существующих параметров в проекте
+        # (без пробелов по краям - так же нормализуются имена ФОП и IDS)
         existing_param_names = set()
         bindings_map = doc.ParameterBindings
         it = bindings_map.ForwardIterator()
         while it.MoveNext():
             definition = it.Key
-            existing_param_names.add(definition.Name)
+            existing_param_names.add(definition.Name.strip())
         Logger.info(SCRIPT_NAME, "Существующих параметров в проекте: {}".format(len(existing_param_names)))
 
+        # Группы ФОП по имени - один обход def_file.Groups вместо обхода на каждый параметр
+        fop_groups = {}
+        for grp in def_file.Groups:
+            fop_groups.setdefault(grp.Name, grp)
+
         Logger.log_separator(SCRIPT_NAME, "Начало транзакции")
 
         added_count = 0
         errors = []
+        log_info = Logger.is_enabled_for("INFO")
+        log_debug = Logger.is_debug_enabled()
 
         # Транзакция
         t = Transaction(doc, "Добавить параметры из ФОП")
+        # Предупреждения (например, о дублях) не должны останавливать пакет диалогом
+        failure_options = t.GetFailureHandlingOptions()
+        failure_options.SetFailuresPreprocessor(WarningsPreprocessor())
+        t.SetFailureHandlingOptions(failure_options)
         t.Start()
         Logger.debug(SCRIPT_NAME, "Транзакция запущена")
 
         try:
-            for idx in all_indices:
-                param = self.parser.parameters[idx]
-                param_name = param['name']
-                group_name = param['group_name']
+            # Параметры с одинаковым набором категорий привязываются одной привязкой:
+            # ключ набора -> [(param_name, ext_def), ...]
+            buckets = {}
+            bucket_order = []
+            bucket_cats = {}  # Ключ набора -> категории [(name, id), ...] для лога
+            cat_sets = {}  # Ключ набора -> CategorySet (None, если привязать не к чему)
+            queued_names = set()  # Имена, уже поставленные в очередь на привязку
+
+            # Неизменные в цикле значения - в локальные переменные
+            ids_data = self.ids_data
+            get_ids_name = self.get_ids_name
+            names = self.parser.names
+            group_names = self.parser.group_names
+            if is_instance:
+                new_binding_fn = app.Create.NewInstanceBinding
+            else:
+                new_binding_fn = app.Create.NewTypeBinding
+
+            for idx, param_name in enumerate(names):
+                group_name = group_names[idx]
+
+                if log_debug:
+                    Logger.debug(SCRIPT_NAME, "Обработка: {} (группа: {})".format(param_name, group_name))
 
-                Logger.debug(SCRIPT_NAME, "Обработка: {} (группа: {})".format(param_name, group_name))
+                # Уже есть в проекте (по имени) - дальше ни IDS, ни Revit API не нужны
+                param_key = param_name.strip()
+                if param_key in existing_param_names:
+                    errors.append("Уже существует: {}".format(param_name))
+                    if log_info:
+                        Logger.info(SCRIPT_NAME, "  ПРОПУСК: параметр '{}' уже существует в проекте".format(param_name))
+                    continue
+                # Дубль имени в ФОП (в другой группе) - привязывается только первый
+                if param_key in queued_names:
+                    errors.append("Дубль в ФОП: {}".format(param_name))
+                    if log_info:
+                        Logger.info(SCRIPT_NAME, "  ПРОПУСК: параметр '{}' уже встречался в ФОП".format(param_name))
+                    continue
 
                 # Получить категории для ЭТОГО параметра из IDS
-                ids_name = self.get_ids_name(param_name)
+                ids_name = get_ids_name(param_name)
                 param_categories = []
-                if ids_name in self.ids_data:
-                    param_categories = get_revit_categories_for_param(self.ids_data[ids_name])
-                    ifc_classes = self.ids_data[ids_name].get('ifc_classes', [])
-                    Logger.debug(SCRIPT_NAME, "  IFC классы: {}".format(", ".join(ifc_classes)))
-                    Logger.debug(SCRIPT_NAME, "  Категории: {}".format(", ".join([c[0] for c in param_categories])))
+                # Ключи ids_data уже без пробелов по краям (strip при разборе IDS) -
+                # один поиск в словаре
+                ids_info = ids_data.get(ids_name)
+                if ids_info is not None:
+                    # Несколько параметров ФОП могут вести к одному параметру IDS
+                    param_categories = self._param_cats_cache.get(ids_name)
+                    if param_categories is None:
+                        param_categories = get_revit_categories_for_param(ids_info)
+                        self._param_cats_cache[ids_name] = param_categories
+                    if log_debug:
+                        ifc_classes = ids_info.get('ifc_classes', [])
+                        Logger.debug(SCRIPT_NAME, "  IFC классы: {}".format(", ".join(ifc_classes)))
+                        Logger.debug(SCRIPT_NAME, "  Категории: {}".format(", ".join([c[0] for c in param_categories])))
                 else:
                     Logger.warning(SCRIPT_NAME, "  Параметр '{}' не найден в IDS (искали '{}')".format(param_name, ids_name))
                     errors.append("Не в IDS: {}".format(param_name))
                     continue
 
-                # Создать CategorySet для ЭТОГО параметра
-                cat_set, failed_cats = create_category_set_for_param(param_categories)
-                if cat_set.IsEmpty:
+                # CategorySet строится один раз на набор категорий
+                cat_key = tuple(sorted(cat_id for _, cat_id in param_categories))
+                if cat_key not in cat_sets:
+                    cat_set, failed_cats, cat_count = create_category_set_for_param(param_categories)
+                    cat_sets[cat_key] = cat_set if cat_count else None
+                if cat_sets[cat_key] is None:
                     Logger.warning(SCRIPT_NAME, "  ПРОПУСК: нет категорий для привязки")
                     errors.append("Нет категорий: {}".format(param_name))
                     continue
 
                 # Найти определение в ФОП
                 ext_def = None
-                for grp in def_file.Groups:
-                    if grp.Name == group_name:
-                        ext_def = grp.Definitions.get_Item(param_name)
-                        break
+                grp = fop_groups.get(group_name)
+                if grp is not None:
+                    ext_def = grp.Definitions.get_Item(param_name)
 
                 if ext_def is None:
                     errors.append("Не найден в ФОП: {}".format(param_name))
                     Logger.warning(SCRIPT_NAME, "  ПРОПУСК: параметр не найден в ФОП файле")
                     continue
 
-                # Проверить, не существует ли уже (по имени)
-                if param_name in existing_param_names:
-                    errors.append("Уже существует: {}".format(param_name))
-                    Logger.info(SCRIPT_NAME, "  ПРОПУСК: параметр '{}' уже существует в проекте".format(param_name))
-                    continue
-
-                # Создать привязку с категориями ЭТОГО параметра
-                if is_instance:
-                    new_binding = app.Create.NewInstanceBinding(cat_set)
-                else:
-                    new_binding = app.Create.NewTypeBinding(cat_set)
+                if cat_key not in buckets:
+                    buckets[cat_key] = []
+                    bucket_order.append(cat_key)
+                    bucket_cats[cat_key] = param_categories
+                buckets[cat_key].append((param_name, ext_def))
+                queued_names.add(param_key)
+
+            for cat_key in bucket_order:
+                # Одна привязка на набор категорий
+                new_binding = new_binding_fn(cat_sets[cat_key])
+                # Строка категорий для лога - одна на набор, а не на каждый параметр
+                cat_names_str = ""
+                if log_info:
+                    cat_names_str = ", ".join(c[0] for c in bucket_cats[cat_key])
+
+                for param_name, ext_def in buckets[cat_key]:
+                    # Добавить параметр в подтранзакции: неудачная привязка откатывается
+                    # отдельно, не затрагивая уже добавленные параметры
+                    sub_t = SubTransaction(doc)
+                    sub_t.Start()
+                    try:
+                        inserted = bindings_map.Insert(ext_def, new_binding, param_group)
+                    except Exception as bind_err:
+                        sub_t.RollBack()
+                        errors.append("{}: {}".format(param_name, str(bind_err)))
+                        Logger.warning(SCRIPT_NAME, "  ОШИБКА ПРИВЯЗКИ {}: {}".format(param_name, str(bind_err)))
+                        continue
 
-                # Добавить параметр (с обработкой ошибок для каждого параметра)
-                try:
-                    if doc.ParameterBindings.Insert(ext_def, new_binding, param_group):
+                    if inserted:
+                        sub_t.Commit()
                         added_count += 1
-                        cat_names = [c[0] for c in param_categories]
-                        Logger.info(SCRIPT_NAME, "  ДОБАВЛЕН: {} -> [{}]".format(param_name, ", ".join(cat_names)))
+                        if log_info:
+                            Logger.info(SCRIPT_NAME, "  ДОБАВЛЕН: {} -> [{}]".format(param_name, cat_names_str))
                     else:
+                        sub_t.RollBack()
                         errors.append("Ошибка добавления: {}".format(param_name))
-                        Logger.error(SCRIPT_NAME, "  ОШИБКА: не удалось добавить параметр")
-                except Exception as bind_err:
-                    errors.append("{}: {}".format(param_name, str(bind_err)))
-                    Logger.warning(SCRIPT_NAME, "  ОШИБКА ПРИВЯЗКИ: {}".format(str(bind_err)))
+                        Logger.error(SCRIPT_NAME, "  ОШИБКА: не удалось добавить параметр {}".format(param_name))
 
             t.Commit()
             Logger.debug(SCRIPT_NAME, "Транзакция завершена (Commit)")
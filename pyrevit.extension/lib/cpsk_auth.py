@@ -23,11 +23,12 @@ CPSK Authentication Module
 import os
 import sys
 import re
+import time
 import urllib2
 import ssl
 
 # Импортируем cpsk_config для работы с настройками
-from cpsk_config import get_setting, set_setting
+from cpsk_config import get_setting, set_setting, get_settings_stamp
 
 # Импортируем config из корня проекта
 _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -44,6 +45,12 @@ _token_cache = {
     "username": None
 }
 
+# Последняя успешная проверка require_auth: (отметка настроек, время);
+# неудачи не кэшируются. Выход или смена токена в другой команде меняют
+# файл настроек, а с ним и отметку - кэш сбрасывается
+AUTH_CACHE_TTL = 300  # секунд
+_last_auth_ok = (None, 0.0)
+
 
 def _escape_json(s):
     """Экранировать строку для JSON."""
@@ -268,11 +275,12 @@ class AuthService(object):
     @staticmethod
     def logout():
         """Выполнить выход."""
-        global _token_cache
+        global _token_cache, _last_auth_ok
 
         # Очищаем кэш
         _token_cache["token"] = None
         _token_cache["username"] = None
+        _last_auth_ok = (None, 0.0)
 
         # Очищаем в конфиге (секция auth)
         set_setting("auth.token", "")
@@ -308,6 +316,23 @@ def require_auth(silent=False):
     Returns:
         bool: True если авторизован, False если нет
     """
+    global _last_auth_ok
+
+    # Успешная проверка действует AUTH_CACHE_TTL секунд, пока настройки
+    # не менялись (проверка по mtime, без чтения файла)
+    now = time.time()
+    stamp = get_settings_stamp()
+    ok_stamp, ok_time = _last_auth_ok
+    if ok_stamp == stamp and 0 <= now - ok_time < AUTH_CACHE_TTL:
+        return True
+
+    # Токен в настройках общий для всех команд: если его сменили или очистили
+    # (выход в другой команде), кэш в памяти этого модуля устарел
+    token = get_setting("auth.token", "") or None
+    if token != _token_cache["token"]:
+        _token_cache["token"] = token
+        _token_cache["username"] = get_setting("auth.email", "") if token else None
+
     # Check DEBUG mode - skip auth if DEBUG is True
     try:
         import sys
@@ -318,11 +343,13 @@ def require_auth(silent=False):
             sys.path.insert(0, project_root)
         from config import DEBUG
         if DEBUG:
+            _last_auth_ok = (stamp, now)
             return True
     except Exception:
         pass  # If config import fails, continue with normal auth check
 
     if AuthService.is_authenticated():
+        _last_auth_ok = (stamp, now)
         return True
 
     if not silent:
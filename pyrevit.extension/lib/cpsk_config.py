@@ -5,6 +5,7 @@ CPSK Config - Модуль управления настройками CPSK Tool
 """
 
 import os
+import json
 import codecs
 from datetime import datetime
 
@@ -13,6 +14,8 @@ _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 EXTENSION_DIR = os.path.dirname(_THIS_DIR)
 PROJECT_DIR = os.path.dirname(EXTENSION_DIR)  # Корень проекта (pyrevit_rocket/)
 SETTINGS_FILE = os.path.join(PROJECT_DIR, "cpsk_settings.yaml")
+# JSON-кэш настроек: читается быстрее YAML, актуален если не старше YAML
+SETTINGS_CACHE_FILE = SETTINGS_FILE + ".json"
 LIB_DIR = _THIS_DIR
 
 # Путь к venv - по умолчанию C:\cpsk_envs
@@ -67,6 +70,10 @@ def set_venv_base_dir(base_dir):
     try:
         # Сохраняем в настройки
         if os.path.exists(SETTINGS_FILE):
+            # YAML правится напрямую и становится новее JSON-кэша - сначала
+            # переносим в него отложенные изменения (write_yaml=False), иначе
+            # они потеряются при следующем чтении настроек
+            flush_settings()
             with codecs.open(SETTINGS_FILE, 'r', 'utf-8') as f:
                 content = f.read()
 
@@ -270,13 +277,98 @@ def _format_value(value):
     return str(value)
 
 
+def _get_mtime(filepath):
+    """Получить время изменения файла (None если файла нет)."""
+    try:
+        return os.stat(filepath).st_mtime
+    except (IOError, OSError):
+        return None
+
+
+def get_settings_stamp():
+    """
+    Отметка версии настроек: (mtime YAML, mtime JSON-кэша).
+    Любое сохранение меняет отметку - по ней можно понять, что настройки
+    не менялись, не читая и не разбирая файлы.
+    """
+    return (_get_mtime(SETTINGS_FILE), _get_mtime(SETTINGS_CACHE_FILE))
+
+
+def _load_settings_cache():
+    """
+    Загрузить настройки из JSON-кэша.
+    Возвращает None если кэша нет или YAML изменён после него (ручная правка).
+    """
+    cache_mtime = _get_mtime(SETTINGS_CACHE_FILE)
+    if cache_mtime is None:
+        return None
+
+    yaml_mtime = _get_mtime(SETTINGS_FILE)
+    if yaml_mtime is not None and yaml_mtime > cache_mtime:
+        return None
+
+    try:
+        with codecs.open(SETTINGS_CACHE_FILE, 'r', 'utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _save_settings_cache(settings):
+    """Атомарно сохранить настройки в JSON-кэш (через временный файл)."""
+    tmp_path = SETTINGS_CACHE_FILE + ".tmp"
+    with codecs.open(tmp_path, 'w', 'utf-8') as f:
+        f.write(json.dumps(settings, ensure_ascii=False))
+
+    # os.replace нет в IronPython 2.7, а os.rename на Windows не перезаписывает
+    if os.path.exists(SETTINGS_CACHE_FILE):
+        os.remove(SETTINGS_CACHE_FILE)
+    os.rename(tmp_path, SETTINGS_CACHE_FILE)
+
+
+# Ошибка записи JSON-кэша уже показана (чтобы не повторять её на каждое чтение)
+_CACHE_ERROR_REPORTED = False
+
+
+def _report_cache_error(error):
+    """Сообщить об ошибке записи JSON-кэша настроек (один раз за сессию)."""
+    global _CACHE_ERROR_REPORTED
+
+    if _CACHE_ERROR_REPORTED:
+        return
+    _CACHE_ERROR_REPORTED = True
+
+    try:
+        from cpsk_notify import show_warning
+        show_warning(
+            "Настройки",
+            "Не удалось обновить кэш настроек",
+            details="{}\n{}".format(SETTINGS_CACHE_FILE, str(error)),
+            blocking=False
+        )
+    except ImportError:
+        pass  # Вне Revit уведомления недоступны
+
+
 def load_settings():
-    """Загрузить настройки из файла."""
+    """Загрузить настройки из JSON-кэша или из YAML файла."""
     settings = dict(DEFAULT_SETTINGS)
 
-    if os.path.exists(SETTINGS_FILE):
+    loaded = _load_settings_cache()
+    if loaded is None and os.path.exists(SETTINGS_FILE):
         try:
             loaded = _simple_yaml_load(SETTINGS_FILE)
+        except Exception:
+            loaded = None
+        if loaded is not None:
+            # Первый запуск или ручная правка YAML - обновляем кэш
+            try:
+                _save_settings_cache(loaded)
+            except Exception as e:
+                _report_cache_error(e)
+
+    if loaded:
+        try:
             # Мержим с defaults
             for section in settings:
                 if section in loaded:
@@ -290,15 +382,29 @@ def load_settings():
     return settings
 
 
-def save_settings(settings):
-    """Сохранить настройки в файл."""
+def save_settings(settings, write_yaml=True):
+    """
+    Сохранить настройки в файл.
+
+    :param settings: Словарь настроек
+    :param write_yaml: False - обновить только JSON-кэш (частые сохранения),
+                       YAML допишется позже через flush_settings()
+    """
     try:
-        _simple_yaml_dump(settings, SETTINGS_FILE)
+        # YAML пишем первым, чтобы кэш оставался не старше него
+        if write_yaml:
+            _simple_yaml_dump(settings, SETTINGS_FILE)
+        _save_settings_cache(settings)
         return True
     except Exception:
         return False
 
 
+def flush_settings():
+    """Записать настройки из JSON-кэша в YAML файл."""
+    return save_settings(load_settings())
+
+
 def get_setting(path, default=None):
     """
     Получить настройку по пути.
@@ -317,12 +423,8 @@ def get_setting(path, default=None):
     return value if value is not None else default
 
 
-def set_setting(path, value):
-    """
-    Установить настройку по пути.
-    Пример: set_setting("environment.python_path", "C:/Python313/python.exe")
-    """
-    settings = load_settings()
+def _assign_setting(settings, path, value):
+    """Записать значение в словарь настроек по пути "section.key"."""
     keys = path.split('.')
 
     # Навигация к нужной секции
@@ -333,7 +435,27 @@ def set_setting(path, value):
         current = current[key]
 
     current[keys[-1]] = value
-    return save_settings(settings)
+
+
+def set_setting(path, value, write_yaml=True):
+    """
+    Установить настройку по пути.
+    Пример: set_setting("environment.python_path", "C:/Python313/python.exe")
+    """
+    settings = load_settings()
+    _assign_setting(settings, path, value)
+    return save_settings(settings, write_yaml)
+
+
+def set_settings(values, write_yaml=True):
+    """
+    Установить несколько настроек за одно чтение/сохранение.
+    Пример: set_settings({"dynamo.recent": [...], "dynamo.favorites": [...]})
+    """
+    settings = load_settings()
+    for path, value in values.items():
+        _assign_setting(settings, path, value)
+    return save_settings(settings, write_yaml)
 
 
 def get_absolute_path(relative_path):
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+CPSK IDS Cache - Кэш результатов парсинга IDS файлов.
+Хранится в %TEMP%/cpsk_ids_cache, актуален пока IDS не изменён.
+"""
+
+import os
+import hashlib
+import tempfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "cpsk_ids_cache")
+# Увеличить при изменении формата кэшируемых данных
+CACHE_VERSION = 1
+
+
+def _file_key(ids_path):
+    """Ключ актуальности: путь, время изменения и размер IDS файла."""
+    st = os.stat(ids_path)
+    return (os.path.abspath(ids_path), st.st_mtime, st.st_size, CACHE_VERSION)
+
+
+def _cache_path(ids_path, kind):
+    """Путь к файлу кэша для IDS файла и вида результата."""
+    digest = hashlib.md5(os.path.abspath(ids_path).encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, "{}_{}.pkl".format(kind, digest))
+
+
+def load_cached(ids_path, kind):
+    """
+    Загрузить результат парсинга из кэша.
+    Возвращает None если кэша нет или IDS изменён после него.
+    """
+    try:
+        key = _file_key(ids_path)
+        with open(_cache_path(ids_path, kind), "rb") as f:
+            entry = pickle.load(f)
+    except Exception:
+        return None
+
+    if entry.get("key") != key:
+        return None
+    return entry.get("data")
+
+
+def save_cached(ids_path, kind, data):
+    """Атомарно сохранить результат парсинга в кэш. Ошибки кэша не критичны."""
+    try:
+        if not os.path.isdir(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+        cache_path = _cache_path(ids_path, kind)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"key": _file_key(ids_path), "data": data}, f, 2)
+
+        # os.replace нет в IronPython 2.7, а os.rename на Windows не перезаписывает
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        os.rename(tmp_path, cache_path)
+    except Exception:
+        return False
+    return True
@@ -8,7 +8,7 @@ CPSK Logger - Модуль логирования для CPSK Tools.
 Использование:
     from cpsk_logger import Logger
 
-    # В начале скрипта - очистить лог и записать заголовок
+    # В начале скрипта - записать заголовок (лог очищается, если разросся)
     Logger.init("FOPtoProject")
 
     Logger.info("FOPtoProject", "Загружен IDS файл")
@@ -50,19 +50,22 @@ class Logger:
     _level = "DEBUG"
     _levels = {"DEBUG": 0, "INFO": 1, "WARNING": 2, "ERROR": 3, "CRITICAL": 4}
     _max_file_size = 5 * 1024 * 1024  # 5 MB
+    _truncate_size = 1024 * 1024  # init очищает лог, только если он больше 1 MB
     _initialized = False
 
     @classmethod
     def init(cls, name):
         """
         Инициализировать логгер для скрипта.
-        Очищает лог и записывает заголовок сессии.
+        Записывает заголовок сессии; лог очищается, только если превысил
+        _truncate_size (иначе новая сессия дописывается в конец).
         Вызывать в начале каждого скрипта.
 
         :param name: Имя скрипта/модуля
         """
         cls._ensure_log_dir()
-        cls.clear()
+        if cls._get_size() > cls._truncate_size:
+            cls.clear()
         cls._initialized = True
 
         # Записываем заголовок сессии
@@ -74,11 +77,7 @@ class Logger:
             u"=" * 70,
             u""
         ]
-        try:
-            with codecs.open(cls._log_file, 'a', 'utf-8') as f:
-                f.write(u"\n".join(header) + u"\n")
-        except (IOError, OSError):
-            pass
+        cls._append(u"\n".join(header) + u"\n")
 
     @classmethod
     def _get_caller_info(cls, stack_level=3):
@@ -120,17 +119,40 @@ class Logger:
                 pass  # Директория уже существует или нет прав
 
     @classmethod
-    def _rotate_if_needed(cls):
-        """Ротация лог-файла если превышен размер."""
+    def _get_size(cls):
+        """Размер файла лога в байтах (0 если файла нет)."""
         try:
-            if os.path.exists(cls._log_file):
-                size = os.path.getsize(cls._log_file)
-                if size > cls._max_file_size:
-                    # Переименовываем старый файл
-                    backup = cls._log_file + ".old"
-                    if os.path.exists(backup):
-                        os.remove(backup)
-                    os.rename(cls._log_file, backup)
+            return os.path.getsize(cls._log_file)
+        except (OSError, IOError):
+            return 0
+
+    @classmethod
+    def _append(cls, text):
+        """
+        Дописать текст в лог.
+        Файл открывается на каждую запись: cpsk.log общий для нескольких
+        команд, долгоживущий handle писал бы по устаревшему смещению.
+        """
+        try:
+            with codecs.open(cls._log_file, 'a', 'utf-8') as f:
+                f.write(text)
+                # Позиция после дозаписи = размер файла в байтах
+                size = f.tell()
+        except (IOError, OSError):
+            return  # Не можем записать - пропускаем молча
+
+        if size > cls._max_file_size:
+            cls._rotate()
+
+    @classmethod
+    def _rotate(cls):
+        """Ротация лог-файла при превышении размера."""
+        try:
+            # Переименовываем старый файл
+            backup = cls._log_file + ".old"
+            if os.path.exists(backup):
+                os.remove(backup)
+            os.rename(cls._log_file, backup)
         except (OSError, IOError):
             pass
 
@@ -145,12 +167,9 @@ class Logger:
         :param stack_level: Уровень стека для определения вызывающего кода
         """
         # Проверка уровня
-        if cls._levels.get(level, 0) < cls._levels.get(cls._level, 0):
+        if not cls.is_enabled_for(level):
             return
 
-        cls._ensure_log_dir()
-        cls._rotate_if_needed()
-
         # Получаем информацию о вызывающем коде
         caller = cls._get_caller_info(stack_level)
 
@@ -161,11 +180,20 @@ class Logger:
             timestamp, level, name, caller, message
         )
 
-        try:
-            with codecs.open(cls._log_file, 'a', 'utf-8') as f:
-                f.write(log_entry)
-        except (IOError, OSError):
-            pass  # Не можем записать - пропускаем молча
+        cls._append(log_entry)
+
+    @classmethod
+    def is_enabled_for(cls, level):
+        """
+        Пишутся ли сообщения уровня level (аналог logging.isEnabledFor).
+        Позволяет не форматировать сообщения в циклах, если они отбрасываются.
+        """
+        return cls._levels.get(level, 0) >= cls._levels.get(cls._level, 0)
+
+    @classmethod
+    def is_debug_enabled(cls):
+        """Пишутся ли DEBUG сообщения (чтобы не форматировать их зря в циклах)."""
+        return cls.is_enabled_for("DEBUG")
 
     @classmethod
     def debug(cls, name, message):
@@ -281,6 +309,10 @@ class Logger:
         :param data: Данные (dict, list, или любой объект)
         :param max_items: Максимум элементов для вывода
         """
+        # Вывод идёт на уровне DEBUG - не перебираем данные зря
+        if not cls.is_enabled_for("DEBUG"):
+            return
+
         cls._write("DEBUG", name, u"ДАННЫЕ [{}]:".format(label))
 
         if isinstance(data, dict):
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+CPSK Paths - Пути расширения для скриптов кнопок.
+"""
+
+import os
+import sys
+
+from cpsk_config import EXTENSION_DIR
+
+# support_files (ifc_mappings и др.) - не в sys.path по умолчанию
+SUPPORT_DIR = os.path.join(EXTENSION_DIR, "support_files")
+
+# Пути, уже добавленные в sys.path в этом процессе
+_INSERTED = set()
+
+
+def ensure_on_syspath(path):
+    """
+    Добавить путь в начало sys.path (один раз за процесс).
+
+    Повторные вызовы - O(1) проверка по множеству без обхода sys.path.
+    """
+    if path in _INSERTED:
+        return
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    _INSERTED.add(path)
@@ -7,8 +7,12 @@ IFC Mappings - Словари для маппинга IFC типов и сущн
 - ФОП в проект (02_FOPtoProject)
 - Экспорт IFC и другие команды
 
-Использование:
-    from support_files.ifc_mappings import IFC_TO_REVIT_TYPE, IFC_TO_REVIT_CATEGORY
+Использование (support_files в sys.path, см. cpsk_paths.SUPPORT_DIR):
+    from ifc_mappings import IFC_TO_REVIT_TYPE, IFC_TO_REVIT_CATEGORY
+
+Импортировать всегда под именем ifc_mappings: тогда все кнопки используют
+один объект модуля из sys.modules и словари строятся один раз за сессию.
+Словари общие - не изменять их в скриптах.
 """
 
 # Маппинг IFC типов данных на типы параметров Revit
@@ -55,6 +59,50 @@ IFC_TO_REVIT_TYPE = {
     "IFCILLUMINANCEMEASURE": "NUMBER",
 }
 
+# Каноническое написание составных имён IFC классов (IFCWALLTYPE -> IfcWallType)
+# Используется при генерации IFC Mapping файла из IDS
+# Простые имена (IFCWALL -> IfcWall) получаются через capitalize и здесь не нужны
+IFC_ENTITY_CANONICAL = {
+    "IFCWALLTYPE": "IfcWallType",
+    "IFCWALLSTANDARDCASE": "IfcWallStandardCase",
+    "IFCWALLELEMENTEDCASE": "IfcWallElementedCase",
+    "IFCSLABTYPE": "IfcSlabType",
+    "IFCSLABSTANDARDCASE": "IfcSlabStandardCase",
+    "IFCSLABELEMENTEDCASE": "IfcSlabElementedCase",
+    "IFCBEAMTYPE": "IfcBeamType",
+    "IFCBEAMSTANDARDCASE": "IfcBeamStandardCase",
+    "IFCCOLUMNTYPE": "IfcColumnType",
+    "IFCCOLUMNSTANDARDCASE": "IfcColumnStandardCase",
+    "IFCMEMBERTYPE": "IfcMemberType",
+    "IFCMEMBERSTANDARDCASE": "IfcMemberStandardCase",
+    "IFCPLATETYPE": "IfcPlateType",
+    "IFCPLATESTANDARDCASE": "IfcPlateStandardCase",
+    "IFCFOOTINGTYPE": "IfcFootingType",
+    "IFCPILETYPE": "IfcPileType",
+    "IFCREINFORCINGBAR": "IfcReinforcingBar",
+    "IFCREINFORCINGBARTYPE": "IfcReinforcingBarType",
+    "IFCREINFORCINGMESH": "IfcReinforcingMesh",
+    "IFCREINFORCINGMESHTYPE": "IfcReinforcingMeshType",
+    "IFCELEMENTASSEMBLY": "IfcElementAssembly",
+    "IFCELEMENTASSEMBLYTYPE": "IfcElementAssemblyType",
+    "IFCBUILDINGELEMENTPROXY": "IfcBuildingElementProxy",
+    "IFCBUILDINGELEMENTPROXYTYPE": "IfcBuildingElementProxyType",
+    "IFCDOORTYPE": "IfcDoorType",
+    "IFCDOORSTANDARDCASE": "IfcDoorStandardCase",
+    "IFCWINDOWTYPE": "IfcWindowType",
+    "IFCWINDOWSTANDARDCASE": "IfcWindowStandardCase",
+    "IFCSTAIRTYPE": "IfcStairType",
+    "IFCSTAIRFLIGHT": "IfcStairFlight",
+    "IFCSTAIRFLIGHTTYPE": "IfcStairFlightType",
+    "IFCRAMPTYPE": "IfcRampType",
+    "IFCRAMPFLIGHT": "IfcRampFlight",
+    "IFCRAMPFLIGHTTYPE": "IfcRampFlightType",
+    "IFCRAILINGTYPE": "IfcRailingType",
+    "IFCROOFTYPE": "IfcRoofType",
+    "IFCCURTAINWALLTYPE": "IfcCurtainWallType",
+    "IFCCOVERINGTYPE": "IfcCoveringType",
+}
+
 # Маппинг IFC сущностей на категории Revit
 # Используется для определения категорий при импорте/экспорте
 # Значение - название категории на английском (Revit internal name)